@@ -0,0 +1,24 @@
+import pandas as pd
+
+# ---- KPIs y gráficos (Vista general) ----
+def _counts(s: pd.Series, name: str) -> pd.DataFrame:
+    # Con categorías value_counts incluye también las que no aparecen: se quitan los ceros
+    out = s.dropna().value_counts(sort=False).loc[lambda c: c > 0].rename_axis(name).reset_index(name="n")
+    return out.sort_values(name, kind="stable").reset_index(drop=True)
+
+def overview(df: pd.DataFrame, rows=None) -> dict:
+    # Una pasada agrupada en servidor: los gráficos reciben sólo estas tablas pequeñas.
+    # Con rows (posiciones) se leen sólo esas filas de las tres columnas necesarias.
+    col = (lambda c: df[c]) if rows is None else (lambda c: df[c].iloc[rows])
+    by_year = _counts(col("Año publicación"), "Año publicación")
+    by_tema = _counts(col("Tema ESG"), "Tema ESG")
+    return {
+        "kpis": {
+            "Total documentos": int(len(df) if rows is None else len(rows)),
+            "Años distintos": int(len(by_year)),
+            "Temas ESG": int(len(by_tema)),
+            "Autoridades emisoras": int(col("Autoridad emisora").nunique()),
+        },
+        "by_year": by_year,
+        "by_tema": by_tema,
+    }
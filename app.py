@@ -1,20 +1,21 @@
 import streamlit as st
 import pandas as pd
 import altair as alt
-import requests
-import re
-import unicodedata
-from urllib.parse import quote, urljoin
-from io import StringIO
-from bs4 import BeautifulSoup
-from datetime import date
-# --- HUBS ---
-HUB_OPTIONS = [
-    "Sustainable Finance",
-    "Net Zero & PA",
-    "Analytics Data & IA",
-    "Sustainability & reporting",
-]
+from datetime import date, datetime
+from form_queue import FormQueue
+from news import DEFAULT_KEYWORDS
+from ingest import NewsIngestor
+from keywords import parse_keywords
+from summaries import SUMMARY_FALLBACK
+from sheet import COLUMNS, SheetLoader, sheet_url
+from search import SearchIndex
+from facets import FacetIndex
+from views import FrameRepository, page_rows
+from view_cache import ViewCache, view_key
+from repo_store import SQL_STORE, RepositoryStore
+from hubs import HUB_OPTIONS
+from dedup import RepositoryIndex
+from perf import get_recorder, span
 
 
 # ===================== CONFIG =====================
@@ -27,25 +28,7 @@ WORKSHEET = "BBDD"
 # Google Form (para altas)
 FORM_ACTION_URL = "https://docs.google.com/forms/d/e/1FAIpQLScTbCS0DRON_-aVzdA4y65_18cicMQdLy98uiapoXqc5B6xeQ/formResponse"
 
-ENTRY_MAP = {k: "" for k in [
-    "Nombre","Documento","Link","Autoridad emisora","Tipo de documento","Ámbito de aplicación",
-    "Tema ESG","Temática ESG","Descripción","Aplicación",
-    "Fecha de publicación","Fecha de aplicación","Comentarios",
-    "UG 01, 02, 03 - bancos","UG04 - Asset management","UG05 - Seguros","UG06 - LATAM","UG07 - Corporates",
-    "Estado","Mes publicación","Año publicación"
-]}
-
-def summarize_url(url, max_sent=3):
-    try:
-        html = safe_get(url)
-        soup = BeautifulSoup(html,"html.parser")
-        text = " ".join(p.get_text(" ",strip=True) for p in soup.find_all("p"))
-        sents = re.split(r"(?<=[.!?]) +", text)
-        return " ".join(sents[:max_sent])
-    except:
-        return "No se pudo generar resumen."
-        
-COLUMNS = list(ENTRY_MAP.keys())
+ENTRY_MAP = {k: "" for k in COLUMNS}
 
 # ===================== THEME (NFQ) =====================
 NFQ_RED = "#9e1927"; NFQ_BLUE = "#6fa2d9"; NFQ_ORANGE = "#d4781b"; NFQ_PURPLE = "#5a64a8"; NFQ_GREY = "#5c6773"
@@ -168,72 +151,235 @@ alt.themes.register("nfq", _nfq_altair_theme)
 alt.themes.enable("nfq")
 
 # ===================== HELPERS =====================
-def _norm_txt(x: str) -> str:
-    if x is None: return ""
-    import unicodedata
-    s = unicodedata.normalize("NFD", str(x))
-    return "".join(ch for ch in s if unicodedata.category(ch) != "Mn").lower()
-
-def ensure_schema(df: pd.DataFrame) -> pd.DataFrame:
-    df.columns = [str(c).strip() for c in df.columns]
-    for c in COLUMNS:
-        if c not in df.columns: df[c] = pd.NA
-    df = df[COLUMNS]
-    for c in ["Fecha de publicación","Fecha de aplicación"]:
-        df[c] = pd.to_datetime(df[c], errors="coerce").dt.date
-    df["Año publicación"] = pd.to_numeric(df["Año publicación"], errors="coerce").astype("Int64")
-    df["Mes publicación"] = df["Mes publicación"].astype(str).replace({"<NA>": ""})
-    return df
-
-@st.cache_data(ttl=30, show_spinner=False)
+@st.cache_resource(show_spinner=False)
+def sheet_loader(sheet_id: str, worksheet: str) -> SheetLoader:
+    # Con OBSERVATORIO_SQL_STORE=1 cada versión se vuelca al SQLite y el proceso no guarda el df
+    return SheetLoader(sheet_url(sheet_id, worksheet), sink=repository_store().mirror if SQL_STORE else None)
+
 def load_sheet(sheet_id: str, worksheet: str) -> pd.DataFrame:
-    url = f"https://docs.google.com/spreadsheets/d/{sheet_id}/gviz/tq?tqx=out:csv&sheet={quote(worksheet)}"
-    r = requests.get(url, timeout=20, headers={"User-Agent":"Mozilla/5.0"}); r.raise_for_status()
-    return ensure_schema(pd.read_csv(StringIO(r.text)).dropna(how="all"))
+    return sheet_loader(sheet_id, worksheet).get()
+
+# Tabla del repositorio: textos largos fuera de la vista paginada
+TABLE_PAGE_SIZES = [25, 50, 100, 250]
+LONG_TEXT_COLUMNS = ["Descripción","Comentarios"]
+
+# Multiselects de la Home: columna -> clave en session_state
+FILTER_KEYS = {"Año publicación": "f_anio", "Tema ESG": "f_tema", "Tipo de documento": "f_tipo",
+               "Ámbito de aplicación": "f_ambito", "Estado": "f_estado"}
+
+# Índices en memoria por versión del Sheet (hash del CSV); el df no se hashea
+@st.cache_resource(show_spinner=False, max_entries=4)
+def search_index(sheet_version: str, _df: pd.DataFrame) -> SearchIndex:
+    return SearchIndex(_df)
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def facet_index(sheet_version: str, _df: pd.DataFrame) -> FacetIndex:
+    return FacetIndex(_df, columns=list(FILTER_KEYS))
+
+# Filtros, recuentos, KPIs y página: en memoria o, con OBSERVATORIO_SQL_STORE=1,
+# en el SQLite compartido por todos los procesos (se vuelca una vez por versión del Sheet)
+@st.cache_resource(show_spinner=False)
+def repository_store() -> RepositoryStore:
+    return RepositoryStore(facets=list(FILTER_KEYS))
+
+def repository(sheet_version: str, df: pd.DataFrame):
+    # Con SQL el loader ya volcó esta versión (sink) y df es None. Sin versión (el Sheet
+    # nunca cargó) la tabla docs no existe aún: se usa el df vacío
+    if SQL_STORE and sheet_version is not None: return repository_store()
+    return FrameRepository(df, facet_index(sheet_version, df), lambda: search_index(sheet_version, df))
+
+# Vistas ya calculadas (filas + recuentos + KPIs/gráficos), compartidas entre sesiones
+@st.cache_resource(show_spinner=False)
+def view_cache() -> ViewCache:
+    return ViewCache()
+
+def filtered_view(sheet_version: str, repo, selections: dict, texto: str) -> dict:
+    key = view_key(sheet_version, selections, texto)
+    def compute():
+        ranked = repo.search(texto) if key[2] else None
+        rows, counts = repo.rows(selections, ranked), repo.counts(selections, ranked)
+        with span("home.aggregate"):
+            return {"rows": rows, "counts": counts, "overview": repo.overview(selections, ranked)}
+    return view_cache().get(key, compute)
+
+# ---- ALTAS (Google Form) ----
+OUTBOX_LABELS = {"queued": "En cola", "sending": "Enviando", "sent": "Enviado", "failed": "Fallido",
+                 "unknown": "Sin confirmar (revisar el Sheet antes de reenviar)"}
+
+@st.cache_resource(show_spinner=False)
+def form_queue() -> FormQueue:
+    return FormQueue().start()
+
+def render_outbox(limit=10):
+    recent = form_queue().recent(limit)
+    if not recent: return
+    with st.expander("Envíos recientes al Form", expanded=False):
+        st.dataframe(pd.DataFrame([{
+            "Documento": r["label"],
+            "Estado": OUTBOX_LABELS.get(r["status"], r["status"]),
+            "Intentos": r["attempts"],
+            "Último error": r["last_error"] or "",
+        } for r in recent]), use_container_width=True, hide_index=True)
 
 # ---- SCRAPING (What's new) ----
-DEFAULT_KEYWORDS = ["climate","esg","sustainable","transition","risk","net zero"]
-def safe_get(url): return requests.get(url, timeout=20, headers={"User-Agent":"Mozilla/5.0"}).text
-
-from urllib.parse import urljoin
-def extract_links(html, base):
-    soup = BeautifulSoup(html,"html.parser"); out=[]
-    for a in soup.find_all("a", href=True):
-        href = urljoin(base,a["href"])
-        txt = a.get_text(" ", strip=True)
-        if len(txt)<5: continue
-        out.append({"title":txt,"url":href,"source":base})
-    return out
-
-@st.cache_data(ttl=600, show_spinner=False)
+# Ingesta en segundo plano: "Cargar noticias" sólo lee del store local
+@st.cache_resource(show_spinner=False)
+def repository_index() -> RepositoryIndex:
+    # Links del Sheet (canónicos) + lo añadido desde aquí; se rehace con cada versión del Sheet
+    return RepositoryIndex(sheet_loader(SHEET_ID, WORKSHEET), repository_store() if SQL_STORE else None)
+
+@st.cache_resource(show_spinner=False)
+def news_ingestor() -> NewsIngestor:
+    return NewsIngestor(known=repository_index()).start()
+
 def fetch_all_news(kws):
-    rows=[]
-    for label,url in [
-        ("PCAF","https://carbonaccountingfinancials.com/en/news-events"),
-        ("NZBA","https://www.unepfi.org/net-zero-banking/"),
-        ("PACTA","https://pacta.rmi.org/"),
-        ("EBA","https://www.eba.europa.eu/homepage"),
-        ("ECB","https://www.ecb.europa.eu/ecb/climate/html/index.en.html"),
-        ("ESMA","https://www.esma.europa.eu/esmas-activities/sustainable-finance"),
-        ("ICC","https://iccwbo.org/news-publications/policies-reports/icc-principles-for-sustainable-trade/?utm_source=chatgpt.com"),
-        ("ICMA","https://www.icmagroup.org/sustainable-finance/the-principles-guidelines-and-handbooks/"),
-        ("CE","https://single-market-economy.ec.europa.eu/industry/sustainability_en"),
-        ("BIS","https://www.bis.org/")]:
-        try:
-            html=safe_get(url)
-            for it in extract_links(html,url):
-                if any(_norm_txt(k) in _norm_txt(it["title"]) for k in kws):
-                    it["source"]=label; rows.append(it)
-        except Exception:
-            continue
-    return pd.DataFrame(rows).drop_duplicates("url")
-
-def classify_hub(source,title):
-    t=_norm_txt(title)
-    if "net zero" in t: return "Net Zero"
-    if "data" in t or "analytics" in t or "ai" in t: return "Data, Analytics & AI"
-    if "pacta" in _norm_txt(source): return "Corporate"
-    return "Sustainable Finance"
+    with span("news.load"):
+        return news_ingestor().news(kws)
+
+# Lista de noticias como fragmento: Add/Delete/paginación sólo relanzan este bloque
+NEWS_PAGE_SIZE = 20
+
+def news_published(row) -> date:
+    # Fecha del feed si la fuente la publica; si no, la del alta
+    published = row.get("published")
+    return date.fromisoformat(published) if isinstance(published, str) and published else date.today()
+
+def news_record(row) -> dict:
+    # Registro (columna del Sheet -> valor) para enviar al Google Form como nueva fila
+    published = news_published(row)
+    return {
+        "Nombre": row["title"],
+        "Documento": "",
+        "Link": row["url"],
+        "Autoridad emisora": row["source"],
+        "Tipo de documento": "Noticia",
+        "Ámbito de aplicación": "",
+        "Tema ESG": "",
+        "Temática ESG": "",
+        "Descripción": row["Resumen"],
+        "Aplicación": "",
+        "Fecha de publicación": published.isoformat(),
+        "Fecha de aplicación": "",
+        "Comentarios": "Añadido desde Noticias",
+        "UG 01, 02, 03 - bancos": "",
+        "UG04 - Asset management": "",
+        "UG05 - Seguros": "",
+        "UG06 - LATAM": "",
+        "UG07 - Corporates": "",
+        "Estado": "Publicado",
+        "Mes publicación": str(published.month),
+        "Año publicación": published.year
+    }
+
+def form_config_error():
+    # Sin FORM_ACTION_URL o sin entry.xxxxx no hay a dónde enviar: no se encola nada
+    if not FORM_ACTION_URL.strip(): return "Falta configurar FORM_ACTION_URL (termina en /formResponse)."
+    if any(v.strip()=="" for v in ENTRY_MAP.values()):
+        return "Faltan `entry.xxxxx` en ENTRY_MAP. Complétalos para enviar al Form."
+    return None
+
+def enqueue_record(record: dict, label: str) -> tuple:
+    # El payload va por entry.xxxxx; la clave de idempotencia, por columna
+    payload = {ENTRY_MAP[k]: v for k, v in record.items()}
+    return form_queue().enqueue(FORM_ACTION_URL, payload, label=label, record=record)
+
+def add_news(rows) -> int:
+    # Sólo se marca como "Ya en el repositorio" lo que está de verdad en la cola o enviado
+    n = 0
+    for r in rows:
+        key, created = enqueue_record(news_record(r), r["title"])
+        if created or form_queue().status(key) in ("queued", "sending", "sent"):
+            repository_index().add(r["url"])
+        n += created
+    return n
+
+def _toggle_news(url):
+    sel = st.session_state["news_selected"]
+    sel.symmetric_difference_update({url})
+
+def _clear_news_selection():
+    st.session_state["news_selected"] = set()
+    for k in [k for k in st.session_state if str(k).startswith("sel_")]: del st.session_state[k]
+
+# Callbacks: se ejecutan antes de volver a pintar el fragmento, que ya sale actualizado
+def _dismiss_news(urls):
+    st.session_state["news_dismissed"].update(urls)
+    st.session_state["news_selected"].difference_update(urls)
+
+def _add_marked(rows):
+    error = form_config_error()
+    if error:
+        st.session_state["news_msg"] = error; return
+    n = add_news(rows)
+    _clear_news_selection()
+    st.session_state["news_msg"] = f"{n} noticias en cola para el Repositorio"
+
+def _dismiss_marked(urls):
+    _dismiss_news(urls)
+    _clear_news_selection()
+
+@st.fragment
+def render_news():
+    df_news = st.session_state.get("df_news", pd.DataFrame())
+    if df_news.empty:
+        st.info("Pulsa **Cargar noticias** para obtener resultados.")
+        return
+    dismissed = st.session_state.setdefault("news_dismissed", set())
+    selected = st.session_state.setdefault("news_selected", set())
+
+    selected_hubs = st.multiselect("Filtrar por HUB", HUB_OPTIONS, default=HUB_OPTIONS)
+    # Multi-etiqueta: basta con que uno de los HUB de la noticia esté seleccionado
+    in_hub = df_news["Hub"].explode().isin(selected_hubs).groupby(level=0).any()
+    df_show = df_news[in_hub.reindex(df_news.index, fill_value=False) & ~df_news["url"].isin(dismissed)]
+
+    if df_show.empty:
+        st.warning("No hay noticias para los HUB seleccionados.")
+        render_outbox()
+        return
+
+    # Acciones en bloque sobre lo marcado (en cualquier página)
+    # Se puede descartar cualquier marcada; añadir, sólo las que aún no están en el repositorio
+    marked = df_show[df_show["url"].isin(selected)]
+    chosen = marked[~marked["En repositorio"]]
+    a1, a2, a3 = st.columns([1.5, 1.5, 4])
+    a1.button(f"Añadir marcadas ({len(chosen)})", disabled=chosen.empty,
+              on_click=_add_marked, args=(chosen.to_dict("records"),))
+    a2.button(f"Descartar marcadas ({len(marked)})", disabled=marked.empty,
+              on_click=_dismiss_marked, args=(list(marked["url"]),))
+    if "news_msg" in st.session_state: st.toast(st.session_state.pop("news_msg"))
+
+    n_pages = max(1, -(-len(df_show) // NEWS_PAGE_SIZE))
+    if st.session_state.get("news_page", 1) > n_pages: st.session_state["news_page"] = n_pages
+    with a3: page = st.number_input(f"Página (de {n_pages})", min_value=1, max_value=n_pages, step=1, key="news_page")
+    page_rows = df_show.iloc[(page - 1) * NEWS_PAGE_SIZE: page * NEWS_PAGE_SIZE]
+
+    st.write(f"Resultados filtrados: {len(df_show)}")
+    for i, row in page_rows.iterrows():
+        c0, c1, c2, c3, c4, c5 = st.columns([0.3, 1.5, 1, 3, 2, 1.5])
+        with c0: st.checkbox("Marcar", value=row["url"] in selected, key=f"sel_{i}",
+                             label_visibility="collapsed", on_change=_toggle_news, args=(row["url"],))
+        with c1: st.markdown(f"**{', '.join(row['Hub'])}**")
+        with c2:
+            # Noticias agrupadas: todas las webs donde ha salido
+            st.markdown(" · ".join(row["Fuentes"]) if len(row.get("Fuentes") or []) > 1 else f"{row['source']}")
+            if row.get("Palabras clave"): st.caption(", ".join(row["Palabras clave"]))
+            if isinstance(row.get("published"), str): st.caption(f"{news_published(row):%d/%m/%Y}")
+        with c3:
+            st.markdown(f"[{row['title']}]({row['url']})")
+            if row["En repositorio"]: st.caption("Ya en el repositorio")
+        with c4:
+            resumen = row['Resumen'] or ("" if row["En repositorio"] else SUMMARY_FALLBACK)
+            st.markdown(resumen[:180] + "..." if len(resumen)>180 else resumen)
+        with c5:
+            if st.button("Add", key=f"add_{i}", disabled=row["En repositorio"]):
+                if form_config_error():
+                    st.error(form_config_error())
+                elif add_news([row]):
+                    st.success("Noticia en cola para el Repositorio")
+                else:
+                    st.info("Esta noticia ya estaba en cola o enviada.")
+            st.button("Delete", key=f"del_{i}", on_click=_dismiss_news, args=([row["url"]],))
+    render_outbox()
 
 # ===================== UI =====================
 st.title("Observatorio ESG — NFQ")
@@ -242,91 +388,123 @@ tabs = st.tabs(["Home","New","What’s new"])
 # ------------ TAB 1: REPOSITORIO ------------
 with tabs[0]:
     try:
-        df_full = load_sheet(SHEET_ID, WORKSHEET)
+        with span("home.load_sheet"):
+            df_full, sheet_version = sheet_loader(SHEET_ID, WORKSHEET).get_versioned()
     except Exception:
         st.error("No se pudo cargar el Google Sheet. Verifica permisos (Lector público), SHEET_ID y nombre de pestaña.")
-        df_full = pd.DataFrame(columns=COLUMNS)
+        df_full, sheet_version = pd.DataFrame(columns=COLUMNS), None
+    else:
+        if sheet_loader(SHEET_ID, WORKSHEET).stale:
+            st.caption("Google Sheet no disponible: se muestra la última copia guardada.")
+
+    # Filtros: se leen del session_state antes de pintarlos para mostrar recuentos vivos
+    with span("home.filter"):
+        repo = repository(sheet_version, df_full)
+        options = repo.options()
+        texto_busqueda = st.session_state.get("f_texto", "")
+        for col, key in FILTER_KEYS.items():
+            if key in st.session_state:
+                st.session_state[key] = [v for v in st.session_state[key] if v in set(options[col])]
+        selections = {col: st.session_state.get(key, []) for col, key in FILTER_KEYS.items()}
+        # Filas, recuentos vivos y KPIs/gráficos de una vez; vistas repetidas salen de la caché
+        view = filtered_view(sheet_version, repo, selections, texto_busqueda)
+        counts = view["counts"]
 
-    # Filtros
     with st.expander("Filtros", expanded=False):
-        col0,col1, col2, col3, col4, col5 = st.columns(6)
-        with col0: filtro_anio = st.multiselect("HUB", HUB_OPTIONS)
-        with col1: filtro_anio = st.multiselect("Año publicación", sorted([x for x in df_full["Año publicación"].dropna().unique()]))
-        with col2: filtro_tema = st.multiselect("Tema ESG", sorted([str(x) for x in df_full["Tema ESG"].dropna().unique()]))
-        with col3: filtro_tipo = st.multiselect("Tipo de documento", sorted([str(x) for x in df_full["Tipo de documento"].dropna().unique()]))
-        with col4: filtro_ambito = st.multiselect("Ámbito de aplicación", sorted([str(x) for x in df_full["Ámbito de aplicación"].dropna().unique()]))
-        with col5: filtro_estado = st.multiselect("Estado", sorted([str(x) for x in df_full["Estado"].dropna().unique()]))
-        texto_busqueda = st.text_input("Búsqueda libre (Nombre, Documento, Descripción, Temática)")
-
-    df = df_full.copy()
-    if not df.empty:
-        if filtro_anio: df = df[df["Año publicación"].isin(filtro_anio)]
-        if filtro_tema: df = df[df["Tema ESG"].astype(str).isin(filtro_tema)]
-        if filtro_tipo: df = df[df["Tipo de documento"].astype(str).isin(filtro_tipo)]
-        if filtro_ambito: df = df[df["Ámbito de aplicación"].astype(str).isin(filtro_ambito)]
-        if filtro_estado: df = df[df["Estado"].astype(str).isin(filtro_estado)]
-        if texto_busqueda:
-            mask = pd.Series(False, index=df.index)
-            for col in ["Nombre","Documento","Descripción","Temática ESG"]:
-                mask = mask | df[col].astype(str).str.contains(texto_busqueda, case=False, na=False)
-            df = df[mask]
-
-    # KPIs (con fondo blanco por CSS)
-    c1, c2, c3, c4 = st.columns(4)
-    with c1: st.metric("Total documentos", int(len(df)))
-    with c2: st.metric("Años distintos", int(df["Año publicación"].nunique()) if not df.empty else 0)
-    with c3: st.metric("Temas ESG", int(df["Tema ESG"].nunique()) if not df.empty else 0)
-    with c4: st.metric("Autoridades emisoras", int(df["Autoridad emisora"].nunique()) if not df.empty else 0)
+        cols = st.columns(6)
+        with cols[0]: st.multiselect("HUB", HUB_OPTIONS)
+        for c, (col, key) in zip(cols[1:], FILTER_KEYS.items()):
+            with c: st.multiselect(col, options[col], key=key,
+                                   format_func=lambda v, col=col: f"{v} ({counts[col].get(v, 0)})")
+        st.text_input("Búsqueda libre (Nombre, Documento, Descripción, Temática)", key="f_texto")
+
+    # Sólo posiciones de fila: nada se copia hasta pintar la página
+    rows = view["rows"]
+
+    # KPIs (con fondo blanco por CSS) y datos de los gráficos, ya agregados
+    ov = view["overview"]
+    for c, (label, value) in zip(st.columns(4), ov["kpis"].items()):
+        with c: st.metric(label, value)
 
     # Gráficos  
     st.markdown("#### Vista general")
-    gcol1, gcol2 = st.columns(2)
-    with gcol1:
-        d1 = df.dropna(subset=["Año publicación"])
-        if not d1.empty:
-            base1 = alt.Chart(d1)
-            bars1 = base1.mark_bar().encode(
-                x=alt.X("Año publicación:O", title="Año", sort=None),
-                y=alt.Y("count()", title="Nº documentos"),
-                color=alt.Color("Año publicación:O", legend=None),
-                tooltip=[alt.Tooltip("Año publicación:O", title="Año"),
-                         alt.Tooltip("count()", title="Nº documentos")]
-            ).properties(height=220)
-            labels1 = base1.mark_text(dy=-6, color="#333").encode(
-                x="Año publicación:O",
-                y="count()",
-                text=alt.Text("count():Q", format="d"),
-            )
-            st.altair_chart((bars1 + labels1).interactive(), use_container_width=True)
-
-    with gcol2:
-        d2 = df.dropna(subset=["Tema ESG"])
-        if not d2.empty:
-            base2 = alt.Chart(d2)
-            bars2 = base2.mark_bar().encode(
-                x=alt.X("count()", title="Nº documentos"),
-                y=alt.Y("Tema ESG:O", sort="-x", title="Tema ESG"),
-                color=alt.Color("Tema ESG:N", legend=None),
-                tooltip=[alt.Tooltip("Tema ESG:O", title="Tema"),
-                         alt.Tooltip("count()", title="Nº documentos")]
-            ).properties(height=220)
-            labels2 = base2.mark_text(dx=6, align="left", color="#333").encode(
-                x="count()",
-                y="Tema ESG:O",
-                text=alt.Text("count():Q", format="d"),
-            )
-            st.altair_chart((bars2 + labels2).interactive(), use_container_width=True)
+    # Specs de Altair + serialización de los dos gráficos
+    with span("home.charts"):
+        gcol1, gcol2 = st.columns(2)
+        with gcol1:
+            d1 = ov["by_year"]
+            if not d1.empty:
+                base1 = alt.Chart(d1)
+                bars1 = base1.mark_bar().encode(
+                    x=alt.X("Año publicación:O", title="Año", sort=None),
+                    y=alt.Y("n:Q", title="Nº documentos"),
+                    color=alt.Color("Año publicación:O", legend=None),
+                    tooltip=[alt.Tooltip("Año publicación:O", title="Año"),
+                             alt.Tooltip("n:Q", title="Nº documentos")]
+                ).properties(height=220)
+                labels1 = base1.mark_text(dy=-6, color="#333").encode(
+                    x=alt.X("Año publicación:O", sort=None),
+                    y="n:Q",
+                    text=alt.Text("n:Q", format="d"),
+                )
+                st.altair_chart((bars1 + labels1).interactive(), use_container_width=True)
+
+        with gcol2:
+            d2 = ov["by_tema"]
+            if not d2.empty:
+                base2 = alt.Chart(d2)
+                bars2 = base2.mark_bar().encode(
+                    x=alt.X("n:Q", title="Nº documentos"),
+                    y=alt.Y("Tema ESG:O", sort="-x", title="Tema ESG"),
+                    color=alt.Color("Tema ESG:N", legend=None),
+                    tooltip=[alt.Tooltip("Tema ESG:O", title="Tema"),
+                             alt.Tooltip("n:Q", title="Nº documentos")]
+                ).properties(height=220)
+                labels2 = base2.mark_text(dx=6, align="left", color="#333").encode(
+                    x="n:Q",
+                    y=alt.Y("Tema ESG:O", sort="-x"),
+                    text=alt.Text("n:Q", format="d"),
+                )
+                st.altair_chart((bars2 + labels2).interactive(), use_container_width=True)
 
     # Tabla con links clicables NO FUNCIONA hacer un check o klk 
+    # Paginada: sólo viaja al navegador la página actual con las columnas elegidas
     st.markdown("#### Repositorio")
-    st.dataframe(
-    df,
-    use_container_width=True,
-    column_config={
-        "Link": st.column_config.LinkColumn("Link", help="Abrir documento"),
-    },
-    height=520
-)
+    short_cols = [c for c in COLUMNS if c not in LONG_TEXT_COLUMNS]
+    with st.expander("Opciones de tabla", expanded=False):
+        t1, t2, t3, t4 = st.columns([4, 2, 1, 1])
+        with t1: visibles = st.multiselect("Columnas visibles", short_cols, default=short_cols, key="t_cols")
+        with t2: sort_by = st.selectbox("Ordenar por", ["—"] + short_cols, key="t_sort")
+        with t3: ascending = st.toggle("Ascendente", value=True, key="t_asc")
+        with t4: page_size = st.selectbox("Filas/página", TABLE_PAGE_SIZES, key="t_size")
+
+    ordered = repo.sort(rows, None if sort_by == "—" else sort_by, ascending)
+    n_pages = max(1, -(-len(ordered) // page_size))
+    if st.session_state.get("t_page", 1) > n_pages: st.session_state["t_page"] = n_pages
+    page = st.number_input(f"Página (de {n_pages})", min_value=1, max_value=n_pages, step=1, key="t_page")
+    visible_rows = page_rows(ordered, page, page_size)
+
+    with span("home.table"):
+        event = st.dataframe(
+        repo.page(visible_rows, visibles or short_cols),
+        use_container_width=True,
+        column_config={
+            "Link": st.column_config.LinkColumn("Link", help="Abrir documento"),
+            "Fecha de publicación": st.column_config.DateColumn(format="DD/MM/YYYY"),
+            "Fecha de aplicación": st.column_config.DateColumn(format="DD/MM/YYYY"),
+        },
+        height=520,
+        on_select="rerun",
+        selection_mode="single-row",
+        key="t_tabla",
+    )
+    # Los textos largos sólo se cargan al seleccionar una fila
+    if event.selection.rows:
+        row = repo.page(visible_rows[event.selection.rows[0]:][:1], ["Nombre"] + LONG_TEXT_COLUMNS).iloc[0]
+        with st.expander(f"Detalle: {row['Nombre']}", expanded=True):
+            for c in LONG_TEXT_COLUMNS:
+                st.markdown(f"**{c}**")
+                st.write(row[c] if pd.notna(row[c]) else "—")
 
 # ------------ TAB 2: ALTA NUEVO ------------
 with tabs[1]:
@@ -367,119 +545,71 @@ with tabs[1]:
         if submitted:
             if not nombre.strip():
                 st.error("El campo *Nombre* es obligatorio.")
-            elif not FORM_ACTION_URL.strip():
-                st.error("Falta configurar FORM_ACTION_URL (termina en /formResponse).")
-            elif any(v.strip()=="" for v in ENTRY_MAP.values()):
-                st.error("Faltan `entry.xxxxx` en ENTRY_MAP. Complétalos para enviar al Form.")
+            elif form_config_error():
+                st.error(form_config_error())
             else:
-                payload = {
-                    ENTRY_MAP["Nombre"]: nombre.strip(),
-                    ENTRY_MAP["Documento"]: documento.strip(),
-                    ENTRY_MAP["Link"]: link.strip(),
-                    ENTRY_MAP["Autoridad emisora"]: autoridad.strip(),
-                    ENTRY_MAP["Tipo de documento"]: tipo.strip(),
-                    ENTRY_MAP["Ámbito de aplicación"]: ambito.strip(),
-                    ENTRY_MAP["Tema ESG"]: tema_esg.strip(),
-                    ENTRY_MAP["Temática ESG"]: tematica_esg.strip(),
-                    ENTRY_MAP["Descripción"]: descripcion.strip(),
-                    ENTRY_MAP["Aplicación"]: aplicacion.strip(),
-                    ENTRY_MAP["Fecha de publicación"]: f_pub.isoformat() if f_pub else "",
-                    ENTRY_MAP["Fecha de aplicación"]: f_apl.isoformat() if f_apl else "",
-                    ENTRY_MAP["Comentarios"]: comentarios.strip(),
-                    ENTRY_MAP["UG 01, 02, 03 - bancos"]: "Sí" if ug_bancos else "",
-                    ENTRY_MAP["UG04 - Asset management"]: "Sí" if ug_am else "",
-                    ENTRY_MAP["UG05 - Seguros"]: "Sí" if ug_seguros else "",
-                    ENTRY_MAP["UG06 - LATAM"]: "Sí" if ug_latam else "",
-                    ENTRY_MAP["UG07 - Corporates"]: "Sí" if ug_corp else "",
-                    ENTRY_MAP["Estado"]: estado,
-                    ENTRY_MAP["Mes publicación"]: str(mes_pub).strip(),
-                    ENTRY_MAP["Año publicación"]: int(anio_pub) if anio_pub else ""
+                record = {
+                    "Nombre": nombre.strip(),
+                    "Documento": documento.strip(),
+                    "Link": link.strip(),
+                    "Autoridad emisora": autoridad.strip(),
+                    "Tipo de documento": tipo.strip(),
+                    "Ámbito de aplicación": ambito.strip(),
+                    "Tema ESG": tema_esg.strip(),
+                    "Temática ESG": tematica_esg.strip(),
+                    "Descripción": descripcion.strip(),
+                    "Aplicación": aplicacion.strip(),
+                    "Fecha de publicación": f_pub.isoformat() if f_pub else "",
+                    "Fecha de aplicación": f_apl.isoformat() if f_apl else "",
+                    "Comentarios": comentarios.strip(),
+                    "UG 01, 02, 03 - bancos": "Sí" if ug_bancos else "",
+                    "UG04 - Asset management": "Sí" if ug_am else "",
+                    "UG05 - Seguros": "Sí" if ug_seguros else "",
+                    "UG06 - LATAM": "Sí" if ug_latam else "",
+                    "UG07 - Corporates": "Sí" if ug_corp else "",
+                    "Estado": estado,
+                    "Mes publicación": str(mes_pub).strip(),
+                    "Año publicación": int(anio_pub) if anio_pub else ""
                 }
-                try:
-                    r = requests.post(FORM_ACTION_URL, data=payload, headers={"Content-Type": "application/x-www-form-urlencoded"}, timeout=20)
-                    if r.status_code in (200, 302):
-                        st.success("Documento enviado correctamente.")
-                        st.balloons()
-                    else:
-                        st.error(f"No se pudo enviar al Form (status {r.status_code}). Revisa FORM_ACTION_URL y ENTRY_MAP.")
-                except Exception as e:
-                    st.error(f"Error al enviar al Form: {e}")
+                _, created = enqueue_record(record, nombre.strip())
+                if created:
+                    st.success("Documento en cola de envío: aparecerá en el Repositorio en unos segundos.")
+                else:
+                    st.info("Este documento ya estaba en cola o enviado.")
+    render_outbox()
 
 # --- NOTICIAS + RESÚMENES ---
 with tabs[2]:
     st.markdown("### What´s New")
 
-    kws = st.text_input("Palabras clave", ", ".join(DEFAULT_KEYWORDS)).split(",")
-
-    if st.button("Cargar noticias"):
+    kws = parse_keywords(st.text_input("Palabras clave", ", ".join(DEFAULT_KEYWORDS)))
+
+    b1, b2, b3 = st.columns([1, 1, 4])
+    with b2:
+        if st.button("Rastrear ahora"):
+            news_ingestor().trigger()
+            st.toast("Rastreo de fuentes lanzado en segundo plano")
+    with b3:
+        last_run = news_ingestor().last_run
+        if last_run: st.caption(f"Última actualización de fuentes: {datetime.fromtimestamp(last_run):%d/%m/%Y %H:%M}")
+    if b1.button("Cargar noticias"):
         with st.spinner("Loading…"):
-            df_news = fetch_all_news(kws).copy()
-            if not df_news.empty:
-                df_news["Hub"] = df_news.apply(lambda r: classify_hub(r["source"], r["title"]), axis=1)
-                df_news["Resumen"] = df_news["url"].apply(lambda u: summarize_url(u, max_sent=2))
+            df_news, failed = fetch_all_news(kws)
             st.session_state["df_news"] = df_news
-
-    df_news = st.session_state.get("df_news", pd.DataFrame())
-
-    if df_news.empty:
-        st.info("Pulsa **Cargar noticias** para obtener resultados.")
-    else:
-        selected_hubs = st.multiselect("Filtrar por HUB", HUB_OPTIONS, default=HUB_OPTIONS)
-        df_show = df_news[df_news["Hub"].isin(selected_hubs)].copy()
-
-        if df_show.empty:
-            st.warning("No hay noticias para los HUB seleccionados.")
-        else:
-            st.write("Resultados filtrados:")
-            for i, row in df_show.iterrows():
-                c1, c2, c3, c4, c5 = st.columns([1.5, 1, 3, 2, 1.5])
-                with c1: st.markdown(f"**{row['Hub']}**")
-                with c2: st.markdown(f"{row['source']}")
-                with c3: st.markdown(f"[{row['title']}]({row['url']})")
-                with c4: st.markdown(row['Resumen'][:180] + "..." if len(row['Resumen'])>180 else row['Resumen'])
-                with c5:
-                    add_key = f"add_{i}"
-                    del_key = f"del_{i}"
-                    if st.button("Add", key=add_key):
-                        # Enviar al Google Form como nuevo registro
-                        payload = {
-                            ENTRY_MAP["Nombre"]: row["title"],
-                            ENTRY_MAP["Documento"]: "",
-                            ENTRY_MAP["Link"]: row["url"],
-                            ENTRY_MAP["Autoridad emisora"]: row["source"],
-                            ENTRY_MAP["Tipo de documento"]: "Noticia",
-                            ENTRY_MAP["Ámbito de aplicación"]: "",
-                            ENTRY_MAP["Tema ESG"]: "",
-                            ENTRY_MAP["Temática ESG"]: "",
-                            ENTRY_MAP["Descripción"]: row["Resumen"],
-                            ENTRY_MAP["Aplicación"]: "",
-                            ENTRY_MAP["Fecha de publicación"]: date.today().isoformat(),
-                            ENTRY_MAP["Fecha de aplicación"]: "",
-                            ENTRY_MAP["Comentarios"]: "Añadido desde Noticias",
-                            ENTRY_MAP["UG 01, 02, 03 - bancos"]: "",
-                            ENTRY_MAP["UG04 - Asset management"]: "",
-                            ENTRY_MAP["UG05 - Seguros"]: "",
-                            ENTRY_MAP["UG06 - LATAM"]: "",
-                            ENTRY_MAP["UG07 - Corporates"]: "",
-                            ENTRY_MAP["Estado"]: "Publicado",
-                            ENTRY_MAP["Mes publicación"]: str(date.today().month),
-                            ENTRY_MAP["Año publicación"]: date.today().year
-                        }
-                        try:
-                            r = requests.post(
-                                FORM_ACTION_URL,
-                                data=payload,
-                                headers={"Content-Type": "application/x-www-form-urlencoded"},
-                                timeout=20
-                            )
-                            if r.status_code in (200, 302):
-                                st.success("Noticia añadida al Repositorio")
-                            else:
-                                st.error(f"No se pudo enviar al Form (status {r.status_code}).")
-                        except Exception as e:
-                            st.error(f"Error al enviar al Form: {e}")
-
-                    if st.button("Delete", key=del_key):
-                        df_news = df_news.drop(i)
-                        st.session_state["df_news"] = df_news
-                        st.warning("Noticia eliminada de la vista")
+            st.session_state["news_failed"] = failed
+            _clear_news_selection()
+
+    failed = st.session_state.get("news_failed", {})
+    if failed:
+        st.warning("Fuentes sin respuesta: " + ", ".join(f"{k} ({v})" for k, v in failed.items()))
+
+    render_news()
+
+# ---- RENDIMIENTO (opcional) ----
+# Tiempos por fase y peticiones HTTP (ventana reciente) + aciertos/fallos de caché
+with st.sidebar:
+    if st.toggle("Panel de rendimiento", key="perf_panel"):
+        rec = get_recorder()
+        st.dataframe(pd.DataFrame(rec.timings()), use_container_width=True, hide_index=True)
+        st.json(rec.counters(), expanded=False)
+        if st.button("Reiniciar métricas"): rec.reset()
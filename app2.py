@@ -1,7 +1,10 @@
 import streamlit as st
 import pandas as pd
 import altair as alt
-import requests
+from http_client import get_client
+from form_queue import FormQueue
+from sheet import SHEET_MAX_BYTES, ensure_schema
+from shared_cache import get_shared_cache
 from urllib.parse import quote
 from io import StringIO
 
@@ -97,36 +100,22 @@ section[data-testid="stSidebar"] > div {{
 """, unsafe_allow_html=True)
 
 # ===================== HELPERS =====================
-def ensure_schema(df: pd.DataFrame) -> pd.DataFrame:
-    df.columns = [str(c).strip() for c in df.columns]
-    for c in COLUMNS:
-        if c not in df.columns:
-            df[c] = pd.NA
-    df = df[COLUMNS]
-    # Fechas
-    for c in ["Fecha de publicación","Fecha de aplicación"]:
-        df[c] = pd.to_datetime(df[c], errors="coerce").dt.date
-    # Año / Mes
-    df["Año publicación"] = pd.to_numeric(df["Año publicación"], errors="coerce").astype("Int64")
-    df["Mes publicación"] = df["Mes publicación"].astype(str).replace({"<NA>": ""})
-    # Extraer URL si viene como =HYPERLINK("url","texto")
-    def clean_link(x):
-        s = str(x)
-        if s.startswith("=HYPERLINK"):
-            import re
-            m = re.search(r'HYPERLINK\("([^"]+)"', s, flags=re.IGNORECASE)
-            return m.group(1) if m else ""
-        return s
-    if "Link" in df.columns:
-        df["Link"] = df["Link"].apply(clean_link)
-    return df
+@st.cache_resource(show_spinner=False)
+def form_queue() -> FormQueue:
+    return FormQueue().start()
 
-@st.cache_data(show_spinner=False, ttl=30)
+# cache_resource: todas las sesiones leen el mismo df (no se modifica) en vez de una copia por rerun
+@st.cache_resource(show_spinner=False, ttl=30)
 def load_sheet(sheet_id: str, worksheet: str) -> pd.DataFrame:
     url = f"https://docs.google.com/spreadsheets/d/{sheet_id}/gviz/tq?tqx=out:csv&sheet={quote(worksheet)}"
-    r = requests.get(url, timeout=20)
-    r.raise_for_status()
-    df = pd.read_csv(StringIO(r.text))
+    def download() -> bytes:
+        r = get_client().get(url, timeout=20, max_bytes=SHEET_MAX_BYTES)
+        r.raise_for_status()
+        return r.text.encode("utf-8")
+    # Con varias réplicas sólo una descarga el CSV cada 30 s; las demás leen su copia
+    shared = get_shared_cache()
+    text = (shared.fetch(f"sheet:{url}", 30, download) if shared else download()).decode("utf-8")
+    df = pd.read_csv(StringIO(text))
     df = df.dropna(how="all")
     return ensure_schema(df)
 
@@ -155,17 +144,19 @@ with tabs[0]:
         with col5: filtro_estado = st.multiselect("Estado", sorted([str(x) for x in df_full["Estado"].dropna().unique()]))
         texto_busqueda = st.text_input("Búsqueda libre (Nombre, Documento, Descripción, Temática)")
 
-    df = df_full.copy()
-    if filtro_anio: df = df[df["Año publicación"].isin(filtro_anio)]
-    if filtro_tema: df = df[df["Tema ESG"].astype(str).isin(filtro_tema)]
-    if filtro_tipo: df = df[df["Tipo de documento"].astype(str).isin(filtro_tipo)]
-    if filtro_ambito: df = df[df["Ámbito de aplicación"].astype(str).isin(filtro_ambito)]
-    if filtro_estado: df = df[df["Estado"].astype(str).isin(filtro_estado)]
+    # Una sola máscara sobre df_full (compartido, sin copiar) y un único recorte al final
+    mask = pd.Series(True, index=df_full.index)
+    if filtro_anio: mask &= df_full["Año publicación"].isin(filtro_anio)
+    if filtro_tema: mask &= df_full["Tema ESG"].isin(filtro_tema)
+    if filtro_tipo: mask &= df_full["Tipo de documento"].isin(filtro_tipo)
+    if filtro_ambito: mask &= df_full["Ámbito de aplicación"].isin(filtro_ambito)
+    if filtro_estado: mask &= df_full["Estado"].isin(filtro_estado)
     if texto_busqueda:
-        mask = pd.Series(False, index=df.index)
+        hit = pd.Series(False, index=df_full.index)
         for col in ["Nombre","Documento","Descripción","Temática ESG"]:
-            mask = mask | df[col].astype(str).str.contains(texto_busqueda, case=False, na=False)
-        df = df[mask]
+            hit |= df_full[col].str.contains(texto_busqueda, case=False, na=False, regex=False)
+        mask &= hit
+    df = df_full[mask]
 
     # KPIs
     c1, c2, c3, c4 = st.columns(4)
@@ -201,6 +192,8 @@ with tabs[0]:
         use_container_width=True,
         column_config={
             "Link": st.column_config.LinkColumn("Link", help="Abrir documento"),
+            "Fecha de publicación": st.column_config.DateColumn(format="DD/MM/YYYY"),
+            "Fecha de aplicación": st.column_config.DateColumn(format="DD/MM/YYYY"),
         },
         height=520
     )
@@ -272,12 +265,8 @@ with tabs[1]:
                     ENTRY_MAP["Mes publicación"]: str(mes_pub).strip(),
                     ENTRY_MAP["Año publicación"]: int(anio_pub) if anio_pub else ""
                 }
-                try:
-                    r = requests.post(FORM_ACTION_URL, data=payload, headers={"Content-Type": "application/x-www-form-urlencoded"}, timeout=20)
-                    if r.status_code in (200, 302):
-                        st.success("Documento enviado correctamente.")
-                        st.balloons()
-                    else:
-                        st.error(f"No se pudo enviar al Form (status {r.status_code}). Revisa FORM_ACTION_URL y ENTRY_MAP.")
-                except Exception as e:
-                    st.error(f"Error al enviar al Form: {e}")
+                _, created = form_queue().enqueue(FORM_ACTION_URL, payload, label=nombre.strip())
+                if created:
+                    st.success("Documento en cola de envío: aparecerá en el Repositorio en unos segundos.")
+                else:
+                    st.info("Este documento ya estaba en cola o enviado.")
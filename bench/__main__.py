@@ -0,0 +1,280 @@
+import os
+import tempfile
+
+# Todo lo que escriben los módulos (SQLite, snapshots) va a un directorio temporal
+WORKDIR = tempfile.mkdtemp(prefix="observatorio-bench-")
+os.environ["OBSERVATORIO_CACHE_DIR"] = WORKDIR
+# Sin caché compartida por defecto: las medidas "en frío" no deben leer lo que dejó otra repetición
+os.environ["OBSERVATORIO_SHARED_CACHE"] = "off"
+
+import argparse
+import itertools
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+import pyarrow as pa
+import crawler
+import summaries
+from aggregates import overview
+from facets import FacetIndex
+from form_queue import FormQueue
+from ingest import NewsIngestor, NewsStore
+from news import DEFAULT_KEYWORDS, NEWS_SOURCES, fetch_sources
+from search import SearchIndex
+from sheet import SheetLoader
+from views import filter_rows, materialize, page_rows, sort_rows
+from repo_store import RepositoryStore
+from view_cache import ViewCache, view_key
+from summaries import SummaryCache, fetch_summary, summarize_urls
+from shared_cache import FileCache
+from bench.stub import LINKS_PER_SOURCE, StubServer
+
+# ---- BENCHMARK OFFLINE ----
+# python -m bench [--sizes 1000 10000] [--out res.json] [--baseline res_anterior.json]
+# Mide el motor de la app (lo que hay detrás de load_sheet, filtros/búsqueda, gráficos,
+# fetch_all_news, summarize_url y el envío al Form) contra un servidor local.
+SIZES = [1_000, 10_000, 100_000]
+REPEAT = 5
+SUMMARY_URLS = 50
+FORM_ITEMS = 50
+REGRESSION = 1.25          # con --baseline: mediana > 1.25x la anterior cuenta como regresión...
+MIN_DELTA_MS = 1.0         # ...si además empeora al menos 1 ms (evita ruido en medidas de microsegundos)
+SEARCH_QUERY = "riesgo climático"
+FILTERS = {"Tema ESG": ["E", "S"], "Estado": ["Publicado", "En consulta"]}
+# Filtros que se van activando uno a uno para ver cómo crece la memoria de un rerun
+RERUN_FILTERS = [("Tema ESG", ["E", "S", "Mixto"]), ("Estado", ["Publicado", "En consulta"]),
+                 ("Tipo de documento", ["Normativa", "Guía", "Informe", "Consulta"]),
+                 ("Ámbito de aplicación", ["UE", "España", "Global"]), ("Año publicación", list(range(2016, 2026)))]
+RERUN_SLACK_KB = 64        # un rerun con k filtros no puede pasar del pico sin filtros más esto
+PAGE_SIZE = 50
+REPLICAS = 4               # réplicas simuladas contra la misma caché compartida
+# Los límites por host son del proceso y duran entre medidas: contra el servidor local se usa uno
+# holgado (mismo código y mismo tope de simultáneas) para medir la app y no las esperas de cortesía
+BENCH_HOST_RATE = 1000.0
+BENCH_HOST_BURST = 50
+
+_ids = itertools.count()
+
+def _path(name):
+    return os.path.join(WORKDIR, f"{name}_{next(_ids)}")
+
+def timed(fn, repeat=REPEAT, setup=None):
+    # setup() prepara estado nuevo en cada repetición (medidas "en frío") y no cuenta en el tiempo
+    times = []
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        t0 = time.perf_counter()
+        fn(arg) if setup else fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return {"repeat": repeat, "min_ms": round(min(times), 3),
+            "median_ms": round(statistics.median(times), 3), "max_ms": round(max(times), 3)}
+
+def bench_sheet(stub, n, repeat):
+    url, out = stub.url(f"/sheet/{n}.csv"), {}
+    SheetLoader(url, snapshot_path=_path("warmup.csv")).get()   # el servidor genera el CSV la primera vez
+    out[f"load_sheet.cold[{n}]"] = timed(lambda l: l.get(), repeat,
+                                         setup=lambda: SheetLoader(url, snapshot_path=_path("sheet.csv")))
+    loader = SheetLoader(url, snapshot_path=_path("sheet.csv"))
+    df = loader.get()
+    out[f"load_sheet.revalidate[{n}]"] = timed(loader.refresh, repeat)
+    out[f"load_sheet.warm[{n}]"] = timed(loader.get, repeat)
+
+    out[f"filter.index_build[{n}]"] = timed(lambda: (SearchIndex(df), FacetIndex(df)), repeat)
+    si, fi = SearchIndex(df), FacetIndex(df)
+    def query():
+        base = fi.from_positions(si.search(SEARCH_QUERY))
+        fi.counts(FILTERS, base=base)
+        return df.iloc[fi.positions(fi.mask(FILTERS, base=base))]
+    out[f"filter.query[{n}]"] = timed(query, repeat)
+    # Misma vista servida desde la caché de vistas (lo que ve la segunda sesión con esos filtros)
+    views = ViewCache()
+    def compute_view():
+        ranked = si.search(SEARCH_QUERY)
+        rows = filter_rows(fi, FILTERS, ranked)
+        return {"rows": rows, "counts": fi.counts(FILTERS, fi.from_positions(ranked)), "overview": overview(df, rows)}
+    def cached_view():
+        return views.get(view_key("v", FILTERS, SEARCH_QUERY), compute_view)
+    out[f"filter.view_cache.miss[{n}]"] = timed(compute_view, repeat)
+    cached_view()
+    out[f"filter.view_cache.hit[{n}]"] = timed(cached_view, repeat)
+    view = query()
+    out[f"chart_prep[{n}]"] = timed(lambda: overview(view), repeat)
+    out[f"chart_prep.full[{n}]"] = timed(lambda: overview(df), repeat)
+
+    # Mismo recorrido con el repositorio en SQLite (OBSERVATORIO_SQL_STORE=1)
+    out[f"sql.mirror[{n}]"] = timed(lambda st: st.mirror(df, "v"), repeat,
+                                    setup=lambda: RepositoryStore(_path("repositorio.sqlite")))
+    store = RepositoryStore(_path("repositorio.sqlite")); store.mirror(df, "v")
+    def sql_query():
+        ranked = store.search(SEARCH_QUERY)
+        store.counts(FILTERS, ranked)
+        rows = store.rows(FILTERS, ranked)
+        store.overview(FILTERS, ranked)
+        return store.page(page_rows(rows, 1, PAGE_SIZE))
+    out[f"sql.query[{n}]"] = timed(sql_query, repeat)
+    return out, {f"rerun.peak_kb[{n}]": rerun_memory(df, fi)}
+
+def _peak_kb(fn):
+    # Pico de Python/numpy (tracemalloc) + pico de los buffers de Arrow (string[pyarrow]), que
+    # tracemalloc no ve: se mide con un pool propio mientras dura fn
+    pool, prev = pa.proxy_memory_pool(pa.system_memory_pool()), pa.default_memory_pool()
+    pa.set_memory_pool(pool); tracemalloc.start()
+    try:
+        fn(); return round((tracemalloc.get_traced_memory()[1] + pool.max_memory()) / 1024, 1)
+    finally:
+        tracemalloc.stop(); pa.set_memory_pool(prev)
+
+def rerun_memory(df, fi, sort_by="Nombre") -> dict:
+    # Pico de memoria de un rerun de la Home (filtrar, KPIs, ordenar, página) con 0..k filtros:
+    # "views" es el camino actual; "copy" el anterior (copia del df y un df nuevo por filtro).
+    # ok: con views, añadir filtros no hace crecer el pico (no se materializa nada por filtro)
+    def views(sel):
+        rows = filter_rows(fi, sel)
+        overview(df, rows)
+        materialize(df, page_rows(sort_rows(df, rows, sort_by), 1, PAGE_SIZE))
+    def copy(sel):
+        d = df.copy()
+        for col, values in sel.items(): d = d[d[col].isin(values)]
+        overview(d)
+        d.loc[d[sort_by].sort_values(kind="stable").index[:PAGE_SIZE]]
+    out = {"views": [], "copy": []}
+    for k in range(len(RERUN_FILTERS) + 1):
+        sel = dict(RERUN_FILTERS[:k])
+        out["views"].append(_peak_kb(lambda: views(sel)))
+        out["copy"].append(_peak_kb(lambda: copy(sel)))
+    out["ok"] = all(kb <= out["views"][0] + RERUN_SLACK_KB for kb in out["views"][1:])
+    return out
+
+def bench_news(stub, repeat):
+    out, sources = {}, stub.sources()
+    out["news.fetch_sources"] = timed(lambda: fetch_sources(sources), repeat)
+
+    def fresh_ingestor():
+        # Store y caché de resúmenes vacíos: lo que cuesta el primer "Cargar noticias"
+        summaries._default_cache = SummaryCache(_path("summaries.sqlite"))
+        return NewsIngestor(store=NewsStore(_path("news.sqlite")), sources=sources)
+    out["fetch_all_news.cold"] = timed(lambda ing: ing.news(DEFAULT_KEYWORDS), repeat, setup=fresh_ingestor)
+    ing = fresh_ingestor(); ing.news(DEFAULT_KEYWORDS)
+    out["fetch_all_news.warm"] = timed(lambda: ing.news(DEFAULT_KEYWORDS), repeat)
+    out["fetch_all_news.crawl"] = timed(ing.run_once, repeat)
+
+    urls = [stub.url(f"/news/{label}/a/{i}") for (label, _), i in
+            zip(itertools.cycle(sources), range(SUMMARY_URLS))]
+    assert SUMMARY_URLS <= LINKS_PER_SOURCE * len(sources)
+    out[f"summarize_url.cold[{SUMMARY_URLS}]"] = timed(
+        lambda c: summarize_urls(urls, max_sent=3, cache=c), repeat,
+        setup=lambda: SummaryCache(_path("summaries.sqlite")))
+    cache = SummaryCache(_path("summaries.sqlite"))
+    summarize_urls(urls, max_sent=3, cache=cache)
+    out[f"summarize_url.warm[{SUMMARY_URLS}]"] = timed(lambda: summarize_urls(urls, max_sent=3, cache=cache), repeat)
+    # Revalidación secuencial con If-None-Match (el servidor responde 304)
+    out[f"summarize_url.revalidate[{SUMMARY_URLS}]"] = timed(
+        lambda: [fetch_summary(u, max_sent=3, cache=cache, ttl=0) for u in urls], repeat)
+    return out
+
+def bench_form(stub, repeat):
+    url = stub.url("/form")
+    payloads = [{"entry.1": f"Documento {i}", "entry.2": "https://example.org"} for i in range(FORM_ITEMS)]
+    def enqueue_all(q):
+        for p in payloads: q.enqueue(url, p, label=p["entry.1"])
+    def queued():
+        q = FormQueue(_path("outbox.sqlite")); enqueue_all(q)
+        return q
+    def drain(q):
+        while q.process_once(): pass
+    return {f"form.enqueue[{FORM_ITEMS}]": timed(enqueue_all, repeat, setup=lambda: FormQueue(_path("outbox.sqlite"))),
+            f"form.submit[{FORM_ITEMS}]": timed(drain, repeat, setup=queued)}
+
+def _replicas(fn):
+    # fn(i) en REPLICAS hilos a la vez, como réplicas que arrancan juntas
+    threads = [threading.Thread(target=fn, args=(i,)) for i in range(REPLICAS)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+
+def bench_shared(stub, n, repeat):
+    # REPLICAS cargadores/ingestores en frío con una caché en disco común: se cuenta cuántas
+    # descargas llegan al servidor (sin caché compartida serían REPLICAS por recurso)
+    url, sources = stub.url(f"/sheet/{n}.csv"), stub.sources()
+    def sheets(cache):
+        _replicas(lambda i: SheetLoader(url, snapshot_path=_path("sheet.csv"), shared=cache).get())
+    def crawls(cache):
+        _replicas(lambda i: NewsIngestor(store=NewsStore(_path("news.sqlite")), sources=sources,
+                                         shared=cache).crawl())
+    before = stub.hits
+    timings = {f"shared.load_sheet.cold[{n}x{REPLICAS}]": timed(sheets, repeat, setup=lambda: FileCache(_path("shared"))),
+               f"shared.crawl.cold[x{REPLICAS}]": timed(crawls, repeat, setup=lambda: FileCache(_path("shared")))}
+    after = stub.hits
+    per_run = lambda k: round((after.get(k, 0) - before.get(k, 0)) / repeat, 2)
+    return timings, {f"sheet.downloads[{n}x{REPLICAS}]": per_run("sheet"),
+                     f"news.source_fetches[x{REPLICAS}]": per_run("news") / len(sources)}
+
+def _git_rev():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout.strip() or None
+    except OSError:
+        return None
+
+def run(sizes=SIZES, repeat=REPEAT, latency=0.0) -> dict:
+    results, memory, shared = {}, {}, {}
+    crawler._limiter = crawler.HostLimiter(rate=BENCH_HOST_RATE, burst=BENCH_HOST_BURST)
+    # Un host por fuente, como en producción: los límites del crawler son por host
+    with StubServer(latency=latency, hosts=len(NEWS_SOURCES)) as stub:
+        for n in sizes:
+            timings, mem = bench_sheet(stub, n, repeat)
+            results.update(timings); memory.update(mem)
+        results.update(bench_news(stub, repeat))
+        results.update(bench_form(stub, repeat))
+        timings, downloads = bench_shared(stub, min(sizes), repeat)
+        results.update(timings); shared.update(downloads)
+    return {"meta": {"commit": _git_rev(), "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                     "python": platform.python_version(), "platform": platform.platform(),
+                     "sizes": list(sizes), "repeat": repeat, "latency": latency},
+            "results": results, "memory": memory, "shared": shared}
+
+def compare(baseline: dict, current: dict, threshold=REGRESSION) -> list:
+    # [(nombre, mediana anterior, mediana actual, ratio)] de lo que empeora más que threshold
+    worse = []
+    for name, r in current["results"].items():
+        old = baseline.get("results", {}).get(name)
+        if not old or not old["median_ms"]: continue
+        ratio = r["median_ms"] / old["median_ms"]
+        print(f"{name:45s} {old['median_ms']:10.2f} -> {r['median_ms']:10.2f} ms  x{ratio:.2f}", file=sys.stderr)
+        if ratio > threshold and r["median_ms"] - old["median_ms"] >= MIN_DELTA_MS: worse.append((name, old["median_ms"], r["median_ms"], ratio))
+    return worse
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m bench", description="Benchmark offline del Observatorio ESG")
+    ap.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    ap.add_argument("--repeat", type=int, default=REPEAT)
+    ap.add_argument("--latency", type=float, default=0.0, help="retardo artificial por petición (s)")
+    ap.add_argument("--out", help="fichero JSON de salida (por defecto stdout)")
+    ap.add_argument("--baseline", help="JSON de una ejecución anterior para comparar")
+    ap.add_argument("--threshold", type=float, default=REGRESSION)
+    args = ap.parse_args(argv)
+
+    res = run(args.sizes, args.repeat, args.latency)
+    text = json.dumps(res, indent=2, ensure_ascii=False)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f: f.write(text + "\n")
+    else:
+        print(text)
+    worse = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            worse = compare(json.load(f), res, args.threshold)
+        for name, old, new, ratio in worse:
+            print(f"REGRESIÓN {name}: {old:.2f} -> {new:.2f} ms (x{ratio:.2f})", file=sys.stderr)
+    # El rerun de la Home no debe gastar más memoria al añadir filtros
+    grew = [name for name, m in res["memory"].items() if isinstance(m, dict) and not m.get("ok", True)]
+    for name in grew:
+        print(f"MEMORIA {name}: {res['memory'][name]['views']} KB crece con los filtros", file=sys.stderr)
+    return 1 if worse or grew else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
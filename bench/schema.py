@@ -0,0 +1,109 @@
+import argparse
+import json
+import re
+import sys
+import time
+from datetime import datetime
+from io import StringIO
+import pandas as pd
+from helpers import _norm_txt
+from sheet import CATEGORY_COLUMNS, COLUMNS, DATE_COLUMNS, UG_COLUMNS, UG_TRUE, ensure_schema
+from bench.synthetic import synthetic_csv
+
+# ---- COMPROBACIÓN DEL ESQUEMA TIPADO ----
+# python -m bench.schema [--rows 10000]
+# Compara ensure_schema (vectorizado) con una referencia fila a fila sobre la BBDD sintética
+# y mide memoria y filtros frente al esquema anterior (todo object). Sale con 1 si difieren.
+_HYPERLINK_RE = re.compile(r'^=HYPERLINK\(\s*"([^"]*)"', flags=re.IGNORECASE)
+_REF_DATE_FORMATS = ["%d/%m/%Y", "%d/%m/%Y %H:%M:%S", "%Y-%m-%d", "%Y-%m-%d %H:%M:%S"]
+
+def _cell(x):
+    return None if x is None or (not isinstance(x, str) and pd.isna(x)) else str(x).strip()
+
+def _ref_date(x):
+    x = _cell(x)
+    for fmt in _REF_DATE_FORMATS:
+        try:
+            return pd.Timestamp(datetime.strptime(x, fmt))
+        except (TypeError, ValueError):
+            pass
+    return None
+
+def _ref_link(x):
+    x = _cell(x)
+    if x is None or not x.startswith("="): return x
+    m = _HYPERLINK_RE.match(x)
+    return m.group(1) if m else None
+
+def reference_rows(raw: pd.DataFrame) -> list:
+    out = []
+    for rec in raw.to_dict("records"):
+        row = {}
+        for c in COLUMNS:
+            v = rec.get(c)
+            if c == "Link": row[c] = _ref_link(v)
+            elif c in UG_COLUMNS: row[c] = (_norm_txt(_cell(v) or "").strip() in UG_TRUE)
+            elif c in DATE_COLUMNS: row[c] = _ref_date(v)
+            elif c == "Año publicación": row[c] = None if _cell(v) is None else int(float(v))
+            elif c == "Mes publicación": row[c] = "" if _cell(v) is None else str(v)
+            elif c in CATEGORY_COLUMNS: row[c] = _cell(v) or None
+            else: row[c] = None if _cell(v) is None else str(v)
+        out.append(row)
+    return out
+
+def _plain(v):
+    return None if v is None or v is pd.NaT or (not isinstance(v, (str, bool)) and pd.isna(v)) else v
+
+def legacy_schema(df: pd.DataFrame) -> pd.DataFrame:
+    # ensure_schema anterior (todo object, fechas como date) como referencia de memoria/velocidad
+    df = df[COLUMNS].copy()
+    for c in DATE_COLUMNS:
+        df[c] = pd.to_datetime(df[c], errors="coerce", dayfirst=True).dt.date
+    df["Año publicación"] = pd.to_numeric(df["Año publicación"], errors="coerce").astype("Int64")
+    df["Mes publicación"] = df["Mes publicación"].astype(str).replace({"<NA>": ""})
+    return df
+
+def _filter(df):
+    m = df["Tema ESG"].isin(["E", "S"]) & df["Estado"].isin(["Publicado"])
+    return df[m & df["Descripción"].str.contains("riesgo", case=False, na=False)]
+
+def _ms(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter(); fn(); best = min(best, time.perf_counter() - t0)
+    return round(best * 1000, 3)
+
+def check(rows=10_000) -> dict:
+    text = synthetic_csv(rows)
+    raw = pd.read_csv(StringIO(text), dtype=str, keep_default_na=False).replace("", None)
+    typed = ensure_schema(pd.read_csv(StringIO(text)).dropna(how="all"))
+    ref = reference_rows(raw)
+    mismatches = []
+    for c in COLUMNS:
+        got = [_plain(v) for v in typed[c].astype(object).tolist()]
+        exp = [r[c] for r in ref]
+        bad = [i for i, (g, e) in enumerate(zip(got, exp)) if g != e]
+        if bad or len(got) != len(exp):
+            i = bad[0] if bad else None
+            mismatches.append({"column": c, "rows": len(bad), "first": None if i is None else
+                               {"row": i, "got": repr(got[i]), "expected": repr(exp[i])}})
+    old = legacy_schema(pd.read_csv(StringIO(text)).dropna(how="all"))
+    return {
+        "rows": rows,
+        "equivalent": not mismatches,
+        "mismatches": mismatches,
+        "memory_mb": {"legacy": round(old.memory_usage(deep=True).sum() / 1e6, 2),
+                      "typed": round(typed.memory_usage(deep=True).sum() / 1e6, 2)},
+        "filter_ms": {"legacy": _ms(lambda: _filter(old)), "typed": _ms(lambda: _filter(typed))},
+        "dtypes": {c: str(t) for c, t in typed.dtypes.items()},
+    }
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m bench.schema")
+    ap.add_argument("--rows", type=int, default=10_000)
+    res = check(ap.parse_args(argv).rows)
+    print(json.dumps(res, indent=2, ensure_ascii=False))
+    return 0 if res["equivalent"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,179 @@
+import hashlib
+import random
+import threading
+import time
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+from news import NEWS_SOURCES
+from bench.synthetic import synthetic_csv
+
+# ---- SERVIDOR LOCAL (sin red) ----
+# /sheet/<n>.csv        BBDD sintética de n filas
+# /news/<fuente>/       portada con enlaces (algunas noticias repetidas entre fuentes)
+# /news/<fuente>/a/<i>  artículo; responde 304 a If-None-Match con su ETag
+# /news/<fuente>/feed.xml  RSS de las mismas noticias (sólo la mitad de las fuentes lo anuncia), con ETag
+# /news/<fuente>/page/<n>  más noticias (la portada es la página 1), enlazadas con "2"/"Next"
+# /robots.txt           veta /private/ (la portada enlaza ahí un "News" que no se debe visitar)
+# POST /form            hace de Google Form
+# Con hosts=N se levantan N servidores (puertos distintos = hosts distintos para el crawler)
+LINKS_PER_SOURCE = 40
+PAGES_PER_SOURCE = 3
+SHARED_STORIES = 8
+TOPICS = ["climate risk","ESG disclosures","sustainable finance","transition plans","net zero banking",
+          "green bonds","taxonomy alignment","biodiversity","stress test","capital requirements"]
+VERBS = ["publishes","launches consultation on","updates guidance on","issues report on","welcomes feedback on"]
+
+def _title(label, i):
+    rng = random.Random(f"{label}/{i}")
+    if i < SHARED_STORIES:
+        # Misma noticia en varias webs con títulos casi iguales
+        story = random.Random(i)
+        base = f"Regulators {story.choice(VERBS)} {story.choice(TOPICS)} for {2020 + i}"
+        return f"{label}: {base}" if rng.random() > 0.5 else base
+    return f"{label} {rng.choice(VERBS)} {rng.choice(TOPICS)} ({i})"
+
+def has_feed(label):
+    return [l for l, _ in NEWS_SOURCES].index(label) % 2 == 0 if label in dict(NEWS_SOURCES) else False
+
+def _published(i):
+    return datetime(2025, 6, 30, 9, tzinfo=timezone.utc) - timedelta(days=i)
+
+def source_page(label, page=1):
+    nav = "".join(f'<li><a href="/{x}">{x}</a></li>' for x in ["Home","About","Press","Jobs"])
+    nav += '<li><a href="/private/archive">News</a></li>'
+    first = (page - 1) * LINKS_PER_SOURCE
+    items = "".join(f'<article><h3><a href="/news/{label}/a/{i}?utm_source=home">{_title(label, i)}</a></h3>'
+                    f'<p>{_title(label, i)} — read more.</p></article>' for i in range(first, first + LINKS_PER_SOURCE))
+    feed = (f'<link rel="alternate" type="application/rss+xml" title="{label}" href="/news/{label}/feed.xml">'
+            if has_feed(label) else "")
+    pager = (f'<a href="/news/{label}/page/{page + 1}">{page + 1}</a> <a href="/news/{label}/page/{page + 1}">Next</a>'
+             if page < PAGES_PER_SOURCE else "")
+    return (f"<html><head><title>{label}</title>{feed}<script>var x = '<a href=\"/no\">no</a>';</script>"
+            f"<style>a{{color:red}}</style></head><body><nav><ul>{nav}</ul></nav>"
+            f"<main>{items}</main><div class='pager'>{pager}</div>"
+            f"<footer><a href='/legal'>Legal notice</a></footer></body></html>")
+
+def feed_xml(label):
+    items = "".join(f"<item><title>{_title(label, i)}</title><link>/news/{label}/a/{i}?utm_source=rss</link>"
+                    f"<pubDate>{format_datetime(_published(i))}</pubDate><description>{_title(label, i)}</description></item>"
+                    for i in range(LINKS_PER_SOURCE))
+    return (f'<?xml version="1.0" encoding="utf-8"?><rss version="2.0"><channel><title>{label}</title>'
+            f"<link>/news/{label}/</link>{items}</channel></rss>")
+
+def article_page(label, i):
+    rng = random.Random(f"art/{label}/{i}")
+    paras = "".join(f"<p>{' '.join(rng.choice(TOPICS) for _ in range(12)).capitalize()}. "
+                    f"The {label} notes that {rng.choice(TOPICS)} remains a priority for supervisors.</p>"
+                    for _ in range(rng.randint(4, 10)))
+    return (f"<html><head><script>track()</script></head><body><header><a href='/'>{label} home</a></header>"
+            f"<h1>{_title(label, i)}</h1>{paras}<aside><p>Related content.</p></aside></body></html>")
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True      # si no, cabecera y cuerpo por separado suman ~40 ms (ACK retardado)
+
+    def log_message(self, *a):
+        pass
+
+    def _send(self, status, body=b"", ctype="text/html; charset=utf-8", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items(): self.send_header(k, v)
+        self.end_headers()
+        if body: self.wfile.write(body)
+
+    def do_GET(self):
+        srv = self.server
+        with srv.lock:
+            srv.active += 1; srv.peak = max(srv.peak, srv.active)
+        try:
+            self._get(srv)
+        finally:
+            with srv.lock: srv.active -= 1
+
+    def _get(self, srv):
+        if srv.latency: time.sleep(srv.latency)
+        parts = [p for p in urlsplit(self.path).path.split("/") if p]
+        with srv.lock:
+            srv.hits[parts[0] if parts else ""] = srv.hits.get(parts[0] if parts else "", 0) + 1
+            srv.log.append((time.monotonic(), self.path))
+        if parts == ["robots.txt"]:
+            body = "User-agent: *\nDisallow: /private/\n" + (f"Crawl-delay: {srv.crawl_delay}\n" if srv.crawl_delay else "")
+            return self._send(200, body.encode("utf-8"), "text/plain; charset=utf-8")
+        if len(parts) == 4 and parts[0] == "news" and parts[2] == "page":
+            return self._send(200, source_page(parts[1], int(parts[3])).encode("utf-8"))
+        if len(parts) == 2 and parts[0] == "sheet" and parts[1].endswith(".csv"):
+            n = int(parts[1][:-4])
+            if n not in srv.sheets: srv.sheets[n] = synthetic_csv(n).encode("utf-8")
+            return self._send(200, srv.sheets[n], "text/csv; charset=utf-8")
+        if len(parts) == 2 and parts[0] == "news":
+            return self._send(200, source_page(parts[1]).encode("utf-8"))
+        if len(parts) == 3 and parts[0] == "news" and parts[2] == "feed.xml":
+            srv.hits["feed"] = srv.hits.get("feed", 0) + 1
+            etag = '"%s"' % hashlib.sha1(self.path.encode()).hexdigest()[:16]
+            if self.headers.get("If-None-Match") == etag:
+                return self._send(304, headers={"ETag": etag})
+            return self._send(200, feed_xml(parts[1]).encode("utf-8"), "application/rss+xml; charset=utf-8",
+                              headers={"ETag": etag})
+        if len(parts) == 4 and parts[0] == "news" and parts[2] == "a":
+            etag = '"%s"' % hashlib.sha1(self.path.encode()).hexdigest()[:16]
+            if self.headers.get("If-None-Match") == etag:
+                return self._send(304, headers={"ETag": etag})
+            return self._send(200, article_page(parts[1], int(parts[3])).encode("utf-8"), headers={"ETag": etag})
+        self._send(404, b"not found")
+
+    def do_POST(self):
+        srv = self.server
+        if srv.latency: time.sleep(srv.latency)
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if urlsplit(self.path).path == "/form":
+            srv.hits["form"] = srv.hits.get("form", 0) + 1
+            return self._send(200, b"<html>ok</html>")
+        self._send(404, b"not found")
+
+class StubServer:
+    # with StubServer(latency=0.01) as s: s.url("/sheet/1000.csv")
+    # hits se suma entre hosts; peaks() y log() son por host (máximo de peticiones simultáneas
+    # y (instante, ruta) de cada GET) para comprobar los límites del crawler
+    def __init__(self, latency=0.0, hosts=1, crawl_delay=None):
+        sheets, hits, lock = {}, {}, threading.Lock()
+        self.httpds = []
+        for _ in range(max(1, hosts)):
+            httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+            httpd.daemon_threads = True
+            httpd.latency, httpd.sheets, httpd.hits, httpd.lock = latency, sheets, hits, lock
+            httpd.crawl_delay, httpd.active, httpd.peak, httpd.log = crawl_delay, 0, 0, []
+            self.httpds.append(httpd)
+        self.httpd = self.httpds[0]
+        self.bases = [f"http://127.0.0.1:{h.server_address[1]}" for h in self.httpds]
+        self.base = self.bases[0]
+
+    def url(self, path, host=0):
+        return self.bases[host % len(self.bases)] + path
+
+    def sources(self):
+        return [(label, self.url(f"/news/{label}/", i)) for i, (label, _) in enumerate(NEWS_SOURCES)]
+
+    @property
+    def hits(self):
+        with self.httpd.lock:
+            return dict(self.httpd.hits)
+
+    def peaks(self) -> dict:
+        return {b: h.peak for b, h in zip(self.bases, self.httpds)}
+
+    def log(self) -> dict:
+        with self.httpd.lock:
+            return {b: list(h.log) for b, h in zip(self.bases, self.httpds)}
+
+    def __enter__(self):
+        for h in self.httpds:
+            threading.Thread(target=h.serve_forever, daemon=True, name="bench-stub").start()
+        return self
+
+    def __exit__(self, *exc):
+        for h in self.httpds:
+            h.shutdown(); h.server_close()
@@ -0,0 +1,56 @@
+import csv
+import io
+import random
+from sheet import COLUMNS, UG_COLUMNS
+
+# ---- DATOS SINTÉTICOS ----
+# BBDD con la forma del Sheet real: fechas dd/mm/aaaa, enlaces como fórmula HYPERLINK,
+# columnas UG con "Sí"/"x"/"No"/vacío, celdas vacías y textos largos en Descripción.
+AUTORIDADES = ["EBA","ESMA","ECB","EIOPA","CE","CNMV","BdE","DGSFP","ISSB","EFRAG","BIS","NGFS"]
+TIPOS = ["Normativa","Guía","Consulta","Informe","Estándar","Q&A"]
+AMBITOS = ["UE","España","Global","LATAM"]
+TEMAS = ["E","S","G","Mixto"]
+TEMATICAS = ["Taxonomía","Divulgación","Riesgos climáticos","Transición","Gobernanza","Finanzas sostenibles","Greenwashing"]
+ESTADOS = ["Publicado","En consulta","Borrador","Derogado"]
+WORDS = ("riesgo climático transición taxonomía divulgación sostenibilidad emisiones bancos seguros "
+         "gestoras supervisión requisitos reporte escenarios biodiversidad gobernanza social verde bonos "
+         "finanzas plan capital estrés datos métricas objetivos").split()
+
+def _text(rng, n):
+    return " ".join(rng.choice(WORDS) for _ in range(n)).capitalize() + "."
+
+def synthetic_rows(n, seed=0):
+    rng = random.Random(seed)
+    for i in range(n):
+        year = rng.randint(2015, 2025)
+        link = f"https://example.org/doc/{i}"
+        row = {
+            "Nombre": f"{rng.choice(TIPOS)} {i}: {_text(rng, 6)}",
+            "Documento": f"{rng.choice(AUTORIDADES)}/{year}/{i:06d}",
+            "Link": f'=HYPERLINK("{link}";"{link}")' if i % 4 == 0 else link,
+            "Autoridad emisora": rng.choice(AUTORIDADES),
+            "Tipo de documento": rng.choice(TIPOS),
+            "Ámbito de aplicación": rng.choice(AMBITOS),
+            "Tema ESG": rng.choice(TEMAS) if rng.random() > 0.05 else "",
+            "Temática ESG": rng.choice(TEMATICAS),
+            "Descripción": " ".join(_text(rng, 12) for _ in range(rng.randint(1, 5))),
+            "Aplicación": rng.choice(["Obligatoria","Voluntaria",""]),
+            # La mayoría dd/mm/aaaa (sin ceros a veces), alguna ISO como las que llegan del Form
+            "Fecha de publicación": (f"{year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}" if i % 10 == 0
+                                     else f"{rng.randint(1, 28)}/{rng.randint(1, 12)}/{year}"),
+            "Fecha de aplicación": f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{year + 1}" if rng.random() > 0.3 else "",
+            "Comentarios": _text(rng, 8) if rng.random() > 0.7 else "",
+            "Estado": rng.choice(ESTADOS),
+            "Mes publicación": str(rng.randint(1, 12)),
+            "Año publicación": str(year),
+        }
+        row.update({c: rng.choice(["Sí", "Sí", "Si", " x"]) if rng.random() > 0.6 else rng.choice(["", "", "No"])
+                    for c in UG_COLUMNS})
+        yield row
+
+def synthetic_csv(n, seed=0) -> str:
+    buf = io.StringIO()
+    w = csv.DictWriter(buf, fieldnames=COLUMNS)
+    w.writeheader()
+    w.writerows(synthetic_rows(n, seed))
+    return buf.getvalue()
@@ -0,0 +1,267 @@
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urldefrag, urljoin, urlsplit
+from urllib.robotparser import RobotFileParser
+import requests
+from http_client import USER_AGENT, get_client
+from perf import count
+
+# ---- CRAWL EDUCADO (What's new) ----
+# Frontera de URLs por host: cada host tiene su cubo de tokens (peticiones/s con ráfaga) y un tope
+# de peticiones simultáneas, y se respeta su robots.txt (incluido Crawl-delay). Entre hosts
+# distintos todo va en paralelo. Desde la portada se siguen, hasta CRAWL_DEPTH saltos, los
+# enlaces de paginación y de listados de noticias del mismo host; cada URL se visita una vez.
+# Cubos y topes son del proceso (get_host_limiter), no de cada crawl: no se reinician entre
+# ejecuciones y los comparten las descargas de artículos para los resúmenes.
+CRAWL_DEPTH = 1
+CRAWL_MAX_PAGES = 5            # páginas extra por fuente, además de la portada
+HOST_RATE = 1.0                # peticiones/s por host...
+HOST_BURST = 2                 # ...con esta ráfaga inicial
+HOST_CONCURRENCY = 2           # peticiones simultáneas por host
+HOST_POLL = 0.1                # host sin hueco libre: se vuelve a mirar pasado este tiempo
+ROBOTS_TTL = 24 * 3600
+ROBOTS_RETRY = 3600            # robots.txt caído: se permite todo y se reintenta pasado este tiempo
+ROBOTS_TIMEOUT = 10
+ROBOTS_MAX_BYTES = 512 * 1024
+
+# Qué enlaces llevan a más noticias: rel="next", paginación en la URL o textos de navegación
+_PAGINATION_RE = re.compile(r"(/page/\d+/?$|[?&](page|p|pg|start|offset)=\d+)", re.IGNORECASE)
+_NAV_TEXT_RE = re.compile(r"^(next|next page|siguiente|older( (posts|news))?|more( news)?|see more|view more|"
+                          r"ver más|más noticias|all news|latest news|news|noticias|press releases?|\d{1,3}|[»›>]+)$",
+                          re.IGNORECASE)
+_SKIP_EXT_RE = re.compile(r"\.(pdf|zip|docx?|xlsx?|pptx?|jpe?g|png|gif|svg|mp[34]|xml|rss|ics)$", re.IGNORECASE)
+
+class RobotsBlocked(Exception):
+    pass
+
+def host_of(url) -> str:
+    # robots.txt y límites van por esquema + host + puerto
+    p = urlsplit(url)
+    return f"{p.scheme}://{p.netloc}".lower()
+
+def follow_links(page_url, anchors, heads=()) -> list:
+    # anchors: [{"title", "url"}] de la página; heads: atributos de sus <link>
+    host, out = host_of(page_url), []
+    for attrs in heads:
+        if "next" in (attrs.get("rel") or "").lower().split() and attrs.get("href"):
+            out.append(urljoin(page_url, attrs["href"]))
+    for a in anchors:
+        url = a["url"]
+        if host_of(url) != host or _SKIP_EXT_RE.search(urlsplit(url).path): continue
+        if _PAGINATION_RE.search(url) or _NAV_TEXT_RE.match(" ".join(a["title"].split())):
+            out.append(url)
+    page = urldefrag(page_url)[0]
+    return [u for u in dict.fromkeys(urldefrag(u)[0] for u in out) if u != page]
+
+class TokenBucket:
+    def __init__(self, rate=HOST_RATE, burst=HOST_BURST):
+        self.rate, self.burst = rate, burst
+        self.tokens, self.updated = float(burst), time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def ready_in(self) -> float:
+        # 0 si hay token (y se gasta); si no, segundos hasta el siguiente
+        with self._lock:
+            self._refill(time.monotonic())
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def slow_down(self, delay):
+        # Crawl-delay de robots.txt: una petición cada delay segundos, sin ráfaga
+        with self._lock:
+            if delay and 1 / delay < self.rate:
+                self.rate, self.burst = 1 / delay, 1
+                self.tokens = min(self.tokens, 1)
+
+class HostLimiter:
+    # Cubo de tokens y tope de peticiones simultáneas por host, compartidos por todo el proceso
+    def __init__(self, rate=HOST_RATE, burst=HOST_BURST, per_host=HOST_CONCURRENCY):
+        self.rate, self.burst, self.per_host = rate, burst, per_host
+        self._buckets, self._inflight = {}, {}
+        self._lock = threading.Lock()
+
+    def bucket(self, host) -> TokenBucket:
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None: bucket = self._buckets[host] = TokenBucket(self.rate, self.burst)
+            return bucket
+
+    def acquire(self, host) -> float:
+        # 0 si hay hueco y token (se ocupan: luego release); si no, segundos hasta reintentar
+        bucket = self.bucket(host)
+        with self._lock:
+            if self._inflight.get(host, 0) >= self.per_host: return HOST_POLL
+            delay = bucket.ready_in()
+            if delay: return delay
+            self._inflight[host] = self._inflight.get(host, 0) + 1
+            return 0.0
+
+    def release(self, host):
+        with self._lock:
+            self._inflight[host] -= 1
+
+    @contextmanager
+    def slot(self, url):
+        # Espera (bloqueando) el turno del host de url
+        host = host_of(url)
+        delay = self.acquire(host)
+        while delay:
+            time.sleep(delay)
+            delay = self.acquire(host)
+        try:
+            yield
+        finally:
+            self.release(host)
+
+_limiter, _limiter_lock = None, threading.Lock()
+
+def get_host_limiter() -> HostLimiter:
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None: _limiter = HostLimiter()
+        return _limiter
+
+class RobotsCache:
+    def __init__(self, ttl=ROBOTS_TTL, user_agent=USER_AGENT, timeout=ROBOTS_TIMEOUT):
+        self.ttl, self.user_agent, self.timeout = ttl, user_agent, timeout
+        self._rules = {}          # host -> (RobotFileParser | True = todo | False = nada, caduca)
+        self._locks, self._lock = {}, threading.Lock()
+
+    def _fetch(self, host):
+        try:
+            r = get_client().get(host + "/robots.txt", timeout=self.timeout, retries=0, max_bytes=ROBOTS_MAX_BYTES)
+        except requests.RequestException:
+            count("robots.error")
+            return True, ROBOTS_RETRY
+        if r.status_code in (401, 403): return False, self.ttl
+        if r.status_code >= 500: return True, ROBOTS_RETRY
+        if r.status_code >= 400: return True, self.ttl
+        rp = RobotFileParser(); rp.parse(r.text.splitlines())
+        return rp, self.ttl
+
+    def rules(self, url):
+        host = host_of(url)
+        with self._lock:
+            lock = self._locks.setdefault(host, threading.Lock())
+        with lock:     # un solo robots.txt por host aunque pidan varios hilos a la vez
+            hit = self._rules.get(host)
+            if hit is None or hit[1] < time.time():
+                rules, ttl = self._fetch(host)
+                hit = self._rules[host] = (rules, time.time() + ttl)
+        return hit[0]
+
+    def allowed(self, url) -> bool:
+        rules = self.rules(url)
+        return rules if isinstance(rules, bool) else rules.can_fetch(self.user_agent, url)
+
+    def crawl_delay(self, url):
+        rules = self.rules(url)
+        return None if isinstance(rules, bool) else rules.crawl_delay(self.user_agent)
+
+_robots, _robots_lock = None, threading.Lock()
+
+def get_robots_cache() -> RobotsCache:
+    global _robots
+    with _robots_lock:
+        if _robots is None: _robots = RobotsCache()
+        return _robots
+
+def failure_reason(e) -> str:
+    if isinstance(e, requests.Timeout): return "timeout"
+    if isinstance(e, requests.HTTPError): return f"HTTP {e.response.status_code}"
+    if isinstance(e, RobotsBlocked): return "robots.txt"
+    return type(e).__name__
+
+class Crawler:
+    # fetch(url, depth, label) -> (links, urls a seguir) hace la descarga y el parseo de una página
+    def __init__(self, fetch, depth=CRAWL_DEPTH, max_workers=6, deadline=30, max_pages=CRAWL_MAX_PAGES,
+                 robots=None, limiter=None):
+        self.fetch, self.depth, self.max_workers, self.deadline = fetch, depth, max_workers, deadline
+        self.max_pages = max_pages
+        self.robots = robots or get_robots_cache()
+        self.limiter = limiter or get_host_limiter()
+
+    def _visit(self, url, depth, label):
+        # El turno del host ya está ocupado (run): se libera al terminar
+        try:
+            if not self.robots.allowed(url):
+                count("crawl.blocked")
+                raise RobotsBlocked(url)
+            self.limiter.bucket(host_of(url)).slow_down(self.robots.crawl_delay(url))
+            count("crawl.page", depth=depth)
+            return self.fetch(url, depth, label)
+        finally:
+            self.limiter.release(host_of(url))
+
+    def run(self, sources):
+        # Devuelve ({fuente: links}, {fuente: motivo}) como news.fetch_sources
+        end = time.monotonic() + self.deadline
+        frontier, futures = {}, {}
+        links, failed, extra = {}, {}, {}
+        seen = set()
+        for label, url in sources:
+            seen.add(urldefrag(url)[0])
+            frontier.setdefault(host_of(url), deque()).append((url, 0, label))
+        pool = ThreadPoolExecutor(max_workers=max(1, self.max_workers))
+        try:
+            while True:
+                # Se lanza todo lo que permitan los cubos y los topes por host
+                next_ready = None
+                for host, queue in frontier.items():
+                    while queue:
+                        delay = self.limiter.acquire(host)
+                        if delay:
+                            next_ready = delay if next_ready is None else min(next_ready, delay)
+                            break
+                        url, depth, label = queue.popleft()
+                        futures[pool.submit(self._visit, url, depth, label)] = (host, url, depth, label)
+                if not futures and next_ready is None: break
+                left = end - time.monotonic()
+                if left <= 0: break
+                if not futures:
+                    time.sleep(min(left, next_ready)); continue
+                done, _ = wait(futures, timeout=min(left, next_ready or left), return_when=FIRST_COMPLETED)
+                for f in done:
+                    host, url, depth, label = futures.pop(f)
+                    try:
+                        items, follow = f.result()
+                    except Exception as e:
+                        # Una subpágina que falla no invalida la fuente; la portada sí
+                        if depth == 0: failed[label] = failure_reason(e)
+                        elif not isinstance(e, RobotsBlocked): count("crawl.error")
+                        continue
+                    links.setdefault(label, []).extend(items)
+                    if depth >= self.depth: continue
+                    for child in follow:
+                        key = urldefrag(child)[0]
+                        if key in seen or extra.get(label, 0) >= self.max_pages: continue
+                        seen.add(key)
+                        # Mismo host que la página de origen: su robots.txt ya está en caché
+                        if host_of(child) == host and not self.robots.allowed(child):
+                            count("crawl.blocked"); continue
+                        extra[label] = extra.get(label, 0) + 1
+                        frontier.setdefault(host_of(child), deque()).append((child, depth + 1, label))
+        finally:
+            # No esperamos a los hilos rezagados: se descartan al terminar su petición
+            pool.shutdown(wait=False, cancel_futures=True)
+            # Las que no llegaron a empezar devuelven su turno del host
+            for f, (host, _, _, _) in futures.items():
+                if f.cancelled(): self.limiter.release(host)
+        # Portadas sin terminar (en curso o sin turno) cuando venció el plazo
+        pending = [(label, depth) for _, _, depth, label in futures.values()]
+        pending += [(label, depth) for queue in frontier.values() for _, depth, label in queue]
+        for label, depth in pending:
+            if depth == 0 and label not in links: failed.setdefault(label, "timeout")
+        order = [label for label, _ in sources]
+        return ({k: links[k] for k in order if k in links},
+                {k: failed[k] for k in order if k in failed})
@@ -0,0 +1,138 @@
+import re
+import threading
+import zlib
+from urllib.parse import unquote_plus, urlsplit, urlunsplit
+import numpy as np
+import pandas as pd
+from helpers import _norm_txt
+
+# ---- DEDUPLICACIÓN DE NOTICIAS ----
+# Parámetros de seguimiento que no cambian el documento
+TRACKING_PARAMS = {"gclid", "fbclid", "msclkid", "mc_cid", "mc_eid", "_ga", "_gl", "igshid", "ref", "ref_src"}
+TRACKING_PREFIXES = ("utm_", "pk_", "mtm_")
+_HYPERLINK_RE = re.compile(r'HYPERLINK\("([^"]+)"', flags=re.IGNORECASE)
+
+def _clean_query(query) -> list:
+    # Trozos "clave=valor" del query tal cual llegan (sin decodificar ni recodificar: "?foo" no
+    # pasa a "?foo=" ni "%20" a "+"); sólo se quitan los de seguimiento
+    out = []
+    for part in query.split("&"):
+        key = unquote_plus(part.split("=", 1)[0]).lower()
+        if part and key not in TRACKING_PARAMS and not key.startswith(TRACKING_PREFIXES): out.append(part)
+    return out
+
+def clean_url(url: str) -> str:
+    # URL segura para guardar y descargar: sin parámetros de seguimiento ni fragmento, host en minúsculas
+    p = urlsplit(str(url).strip())
+    return urlunsplit((p.scheme.lower(), p.netloc.lower(), p.path, "&".join(_clean_query(p.query)), ""))
+
+def canonical_url(url: str) -> str:
+    # Clave de identidad: además ignora http/https, "www.", puerto por defecto, barra final y orden de parámetros
+    url = str(url).strip()
+    m = _HYPERLINK_RE.search(url) if url.startswith("=") else None
+    if m: url = m.group(1)
+    if "://" not in url: url = "//" + url
+    p = urlsplit(url)
+    host = (p.hostname or "").lower()
+    if host.startswith("www."): host = host[4:]
+    if p.port and p.port not in (80, 443): host = f"{host}:{p.port}"
+    path = re.sub(r"/{2,}", "/", p.path).rstrip("/")
+    query = "&".join(sorted(_clean_query(p.query)))
+    return host + path + ("?" + query if query else "")
+
+class UrlIndex:
+    # Conjunto de URLs canónicas: "¿ya lo tenemos?" en O(1)
+    def __init__(self, urls=()):
+        self._keys = set()
+        self.update(urls)
+
+    def update(self, urls):
+        for u in urls:
+            if isinstance(u, str) and u.strip() and u.strip().lower() not in ("nan", "<na>"):
+                self._keys.add(canonical_url(u))
+
+    def add(self, url):
+        self.update([url])
+
+    def __contains__(self, url):
+        return isinstance(url, str) and canonical_url(url) in self._keys
+
+    def __len__(self):
+        return len(self._keys)
+
+    def mask(self, urls: pd.Series) -> pd.Series:
+        return urls.map(lambda u: u in self)
+
+class RepositoryIndex:
+    # Índice de la columna Link del Sheet. Se reconstruye cuando cambia la versión del Sheet
+    # y conserva lo añadido desde la app mientras el Form todavía no lo ha volcado al Sheet.
+    # Con store (repo_store.RepositoryStore) el loader no guarda el df: los Links salen del SQLite.
+    def __init__(self, loader, store=None):
+        self.loader, self.store = loader, store
+        self._version, self._index, self._added = None, UrlIndex(), set()
+        self._lock = threading.Lock()
+
+    def current(self) -> UrlIndex:
+        try:
+            df, version = self.loader.get_versioned()
+        except Exception:
+            return self._index
+        with self._lock:
+            if version != self._version:
+                index = UrlIndex(self.store.links() if df is None else df["Link"].dropna().astype(str))
+                index.update(self._added)
+                self._index, self._version = index, version
+            return self._index
+
+    def add(self, url):
+        with self._lock:
+            self._added.add(url); self._index.add(url)
+
+    def __contains__(self, url):
+        return url in self.current()
+
+# ---- NOTICIAS CASI DUPLICADAS (MinHash + LSH) ----
+# La misma nota sale en varias webs con títulos algo distintos. Cada título se trocea en
+# n-gramas de caracteres; MinHash resume cada conjunto en NUM_PERM enteros y LSH (bandas)
+# sólo propone como candidatos los pares que comparten alguna banda: sin comparar todos con todos.
+# Los candidatos se confirman con Jaccard exacto >= TITLE_SIMILARITY y sólo si llevan los mismos
+# números (años, trimestres, nº de guía: "Q1 2024" y "Q2 2024" son documentos distintos). Dos
+# enlaces de la misma fuente nunca van al mismo grupo: se agrupa la misma nota en webs distintas.
+TITLE_SHINGLE = 4
+TITLE_SIMILARITY = 0.7
+MINHASH_PERM = 128
+LSH_BANDS = 32                      # 32 bandas x 4 filas: umbral efectivo ~0.42
+# Si cambia, los grupos guardados en el store de noticias se recalculan
+TITLE_CLUSTER_VERSION = f"{TITLE_SHINGLE}/{TITLE_SIMILARITY}/{MINHASH_PERM}/{LSH_BANDS}/fuente+números"
+_PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(20240501)
+_A = _rng.integers(1, _PRIME, MINHASH_PERM, dtype=np.int64)
+_B = _rng.integers(0, _PRIME, MINHASH_PERM, dtype=np.int64)
+_PUNCT_RE = re.compile(r"[^\w]+")
+_NUMBER_RE = re.compile(r"\w*\d\w*")
+
+def title_shingles(title, k=TITLE_SHINGLE) -> set:
+    t = " ".join(_PUNCT_RE.sub(" ", _norm_txt(title)).split())
+    if len(t) <= k: return {t} if t else set()
+    return {t[i:i + k] for i in range(len(t) - k + 1)}
+
+def minhash(shingles) -> np.ndarray:
+    if not shingles: return np.full(MINHASH_PERM, _PRIME, dtype=np.int64)
+    x = np.fromiter((zlib.crc32(s.encode()) & 0x7FFFFFFF for s in shingles), dtype=np.int64, count=len(shingles))
+    return ((_A[:, None] * x[None, :] + _B[:, None]) % _PRIME).min(axis=1)
+
+def title_bands(shingles, bands=LSH_BANDS) -> list:
+    # Claves LSH de un título (una por banda de su firma MinHash); sin n-gramas no hay claves
+    if not shingles: return []
+    sig, rows = minhash(shingles), MINHASH_PERM // bands
+    return [sig[b * rows:(b + 1) * rows].tobytes() for b in range(bands)]
+
+def jaccard(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+def title_numbers(title) -> frozenset:
+    return frozenset(_NUMBER_RE.findall(_norm_txt(title)))
+
+def same_story(a, b, threshold=TITLE_SIMILARITY) -> bool:
+    # a, b: (n-gramas, números) de dos títulos
+    return a[1] == b[1] and jaccard(a[0], b[0]) >= threshold
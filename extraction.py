@@ -0,0 +1,166 @@
+import codecs
+import re
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+
+# ---- EXTRACCIÓN HTML EN STREAMING ----
+# Se procesa la página según llega y sólo se miran las etiquetas que interesan (<a> o <p>).
+# Los resúmenes paran en cuanto hay max_sent frases completas; todo para al llegar al tope de bytes.
+LINKS_MAX_BYTES = 2 * 1024 * 1024
+SUMMARY_MAX_BYTES = 512 * 1024
+CHUNK_SIZE = 16 * 1024
+
+_SENT_RE = re.compile(r"(?<=[.!?]) +")
+_SKIP_TAGS = {"script", "style", "noscript", "template"}
+
+def iter_text(r, chunk_size=CHUNK_SIZE):
+    # Trocea el cuerpo de una respuesta en streaming ya decodificado (utf-8 si no viene charset)
+    ctype = r.headers.get("Content-Type", "")
+    enc = r.encoding if "charset" in ctype.lower() and r.encoding else "utf-8"
+    try:
+        dec = codecs.getincrementaldecoder(enc)(errors="replace")
+    except LookupError:
+        dec = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    for chunk in r.iter_content(chunk_size):
+        yield dec.decode(chunk)
+    yield dec.decode(b"", final=True)
+
+class _Collector:
+    # Recibe start/end/data de cualquier backend; done=True corta la lectura
+    tags = ()
+    def __init__(self):
+        self.done, self._skip, self._stack, self._pending = False, 0, [], []
+
+    def flush(self):
+        # El texto entre dos etiquetas puede llegar troceado: se une antes de limpiarlo
+        text = "".join(self._pending).strip(); self._pending.clear()
+        if text: self._stack[-1][2].append(text)
+
+    def start(self, tag, attrs):
+        self.flush()
+        if tag in _SKIP_TAGS: self._skip += 1
+        elif tag in self.tags:
+            # <p> y <a> no se anidan en sí mismos: uno nuevo cierra el anterior
+            if self._stack and self._stack[-1][0] == tag: self.end(tag)
+            self._stack.append((tag, attrs, []))
+
+    def end(self, tag):
+        self.flush()
+        if tag in _SKIP_TAGS: self._skip = max(0, self._skip - 1)
+        elif tag in self.tags and self._stack and self._stack[-1][0] == tag:
+            tag, attrs, parts = self._stack.pop()
+            text = " ".join(parts)
+            for outer in self._stack: outer[2].append(text)
+            self.element(tag, attrs, text)
+
+    def finish(self):
+        self.flush()
+        while self._stack and not self.done: self.end(self._stack[-1][0])
+
+    def data(self, text):
+        if self._stack and not self._skip: self._pending.append(text)
+
+    def element(self, tag, attrs, text):
+        pass
+
+    def void(self, tag, attrs):
+        # Etiquetas sin cierre ni texto (<link> de la cabecera)
+        pass
+
+class LinkCollector(_Collector):
+    tags = ("a",)
+    def __init__(self, base):
+        super().__init__(); self.base, self.links, self.heads, self.nav = base, [], [], []
+
+    def void(self, tag, attrs):
+        self.heads.append(attrs)
+
+    def element(self, tag, attrs, text):
+        href = attrs.get("href")
+        if href is None: return
+        # Textos cortos ("2", "»", "Next") no son noticias, pero sirven para paginar
+        link = {"title": text, "url": urljoin(self.base, href), "source": self.base}
+        (self.links if len(text) >= 5 else self.nav).append(link)
+
+class SummaryCollector(_Collector):
+    tags = ("p",)
+    def __init__(self, max_sent=3):
+        super().__init__(); self.max_sent, self.paras = max_sent, []
+
+    def element(self, tag, attrs, text):
+        self.paras.append(text)
+        # Con una frase más de las pedidas, las primeras max_sent ya están completas
+        if len(_SENT_RE.split(" ".join(self.paras), maxsplit=self.max_sent)) > self.max_sent:
+            self.done = True
+
+    def summary(self):
+        return " ".join(_SENT_RE.split(" ".join(self.paras))[:self.max_sent])
+
+# ---- Backends ----
+class _StdlibParser(HTMLParser):
+    def __init__(self, collector):
+        super().__init__(convert_charrefs=True); self.c = collector
+    def handle_starttag(self, tag, attrs):
+        if tag == "link": self.c.void(tag, dict(attrs))
+        else: self.c.start(tag, dict(attrs))
+    def handle_endtag(self, tag): self.c.end(tag)
+    def handle_data(self, data): self.c.data(data)
+    def handle_comment(self, data): self.c.flush()
+
+def _feed_stdlib(chunks, collector, max_bytes):
+    p, seen = _StdlibParser(collector), 0
+    for chunk in chunks:
+        p.feed(chunk); seen += len(chunk)
+        if collector.done or seen >= max_bytes: return
+    p.close(); collector.finish()
+
+def _lxml_text(el):
+    from lxml import etree
+    etree.strip_elements(el, *_SKIP_TAGS, with_tail=False)
+    return " ".join(t.strip() for t in el.itertext(etree.Element) if t.strip())
+
+def _feed_lxml(chunks, collector, max_bytes):
+    # lxml arma el árbol: se lee cada <a>/<p> al cerrarse y se poda lo demás sobre la marcha
+    from lxml import etree
+    p, seen, depth = etree.HTMLPullParser(events=("start", "end")), 0, 0
+
+    def drain():
+        nonlocal depth
+        for ev, el in p.read_events():
+            if not isinstance(el.tag, str) or collector.done: continue
+            if ev == "start":
+                if el.tag in collector.tags: depth += 1
+                elif el.tag == "link": collector.void(el.tag, dict(el.attrib))
+                continue
+            if el.tag in collector.tags:
+                depth -= 1
+                collector.element(el.tag, dict(el.attrib), _lxml_text(el))
+            if depth == 0: el.clear(keep_tail=True)
+
+    for chunk in chunks:
+        p.feed(chunk); seen += len(chunk); drain()
+        if collector.done or seen >= max_bytes: return
+    p.close(); drain()
+
+PARSERS = {"html.parser": _feed_stdlib}
+try:
+    import lxml.etree  # noqa: F401
+    PARSERS["lxml"] = _feed_lxml
+except ImportError:
+    pass
+DEFAULT_PARSER = "lxml" if "lxml" in PARSERS else "html.parser"
+
+def _chunks(src):
+    return [src] if isinstance(src, str) else src
+
+def extract_page(src, base, parser=None, max_bytes=LINKS_MAX_BYTES):
+    # (enlaces <a>, atributos de cada <link>, enlaces de texto corto): los <link> sirven para
+    # descubrir el feed de la página y, con los enlaces cortos, para encontrar la paginación
+    c = LinkCollector(base)
+    PARSERS[parser or DEFAULT_PARSER](_chunks(src), c, max_bytes)
+    return c.links, c.heads, c.nav
+
+def extract_summary(src, max_sent=3, parser=None, max_bytes=SUMMARY_MAX_BYTES) -> str:
+    c = SummaryCollector(max_sent)
+    PARSERS[parser or DEFAULT_PARSER](_chunks(src), c, max_bytes)
+    return c.summary()
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+# ---- FILTROS (facetas) ----
+FACET_COLUMNS = ["Año publicación","Tema ESG","Tipo de documento","Ámbito de aplicación","Estado"]
+
+# nº de bits a 1 de cada byte, para contar sobre bitmaps empaquetados
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.int64)
+
+def _facet_value(x):
+    return int(x) if isinstance(x, (int, np.integer)) else str(x)
+
+class FacetIndex:
+    # Bitmap de filas por cada valor de cada faceta, construido una vez por versión del Sheet.
+    # Filtrar = OR de los valores elegidos en una faceta y AND entre facetas; sin copias del df.
+    def __init__(self, df: pd.DataFrame, columns=FACET_COLUMNS):
+        self.n = len(df)
+        self.all = self.from_positions(np.arange(self.n))
+        self.bitmaps, self.options = {}, {}
+        for col in columns:
+            s = df[col] if col in df.columns else pd.Series([], dtype=object)
+            valid = s.notna().to_numpy()
+            pos = np.flatnonzero(valid)
+            codes, uniques = pd.factorize(s[valid])
+            keys = [_facet_value(u) for u in uniques]
+            order = np.argsort(codes, kind="stable")
+            bounds = np.searchsorted(codes[order], np.arange(len(keys) + 1))
+            self.bitmaps[col] = {k: self.from_positions(pos[order[bounds[i]:bounds[i + 1]]])
+                                 for i, k in enumerate(keys)}
+            self.options[col] = sorted(self.bitmaps[col])
+
+    def from_positions(self, positions) -> np.ndarray:
+        bits = np.zeros(self.n, dtype=bool); bits[positions] = True
+        return np.packbits(bits)
+
+    def to_bool(self, bm) -> np.ndarray:
+        return np.unpackbits(bm, count=self.n).astype(bool)
+
+    def positions(self, bm) -> np.ndarray:
+        return np.flatnonzero(np.unpackbits(bm, count=self.n))
+
+    @staticmethod
+    def count(bm) -> int:
+        return int(_POPCOUNT[bm].sum())
+
+    def _facet(self, col, values):
+        bm = np.zeros_like(self.all)
+        for v in values:
+            hit = self.bitmaps[col].get(v)
+            if hit is not None: bm |= hit
+        return bm
+
+    def mask(self, selections: dict, base=None, exclude=None) -> np.ndarray:
+        bm = (self.all if base is None else base).copy()
+        for col, values in selections.items():
+            if values and col != exclude: bm &= self._facet(col, values)
+        return bm
+
+    def counts(self, selections: dict, base=None) -> dict:
+        # Recuento vivo por opción: cada faceta se cuenta con el resto de filtros aplicados
+        # (sin el suyo propio), como en cualquier buscador facetado
+        out = {}
+        for col, bitmaps in self.bitmaps.items():
+            others = self.mask(selections, base, exclude=col)
+            out[col] = {v: self.count(bm & others) for v, bm in bitmaps.items()}
+        return out
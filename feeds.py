@@ -0,0 +1,153 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urljoin
+from xml.etree.ElementTree import ParseError, XMLPullParser
+from helpers import CACHE_DIR
+from http_client import get_client
+from perf import count
+
+# ---- FEEDS RSS/ATOM (What's new) ----
+# Si la portada de una fuente anuncia un feed (<link rel="alternate" type="application/rss+xml">)
+# se usa el feed en vez de rascar todos sus <a>: menos bytes, sin enlaces de navegación y con
+# fecha de publicación. El registro guarda el feed de cada portada, su ETag/Last-Modified y los
+# últimos items: con 304 no se descarga ni se parsea nada.
+FEED_DB = os.path.join(CACHE_DIR, "feeds.sqlite")
+FEED_TYPES = ("application/rss+xml", "application/atom+xml")
+FEED_MAX_ITEMS = 200
+FEED_MAX_BYTES = 2 * 1024 * 1024
+CHUNK_SIZE = 16 * 1024
+
+class FeedRegistry:
+    def __init__(self, path=FEED_DB):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        with closing(self._db()) as db:
+            db.execute("""CREATE TABLE IF NOT EXISTS feeds (
+                page TEXT PRIMARY KEY, feed TEXT, etag TEXT, last_modified TEXT, items TEXT, checked_at REAL)""")
+
+    def _db(self):
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def get(self, page):
+        with closing(self._db()) as db:
+            row = db.execute("SELECT feed, etag, last_modified, items, checked_at FROM feeds WHERE page=?",
+                             (page,)).fetchone()
+        if row is None: return None
+        return {"feed": row[0], "etag": row[1], "last_modified": row[2],
+                "items": None if row[3] is None else json.loads(row[3]), "checked_at": row[4]}
+
+    def set_feed(self, page, feed):
+        # Feed descubierto (o None si la portada ya no lo anuncia); un feed nuevo empieza sin validadores
+        with closing(self._db()) as db:
+            db.execute("""INSERT INTO feeds (page, feed) VALUES (?, ?) ON CONFLICT(page) DO UPDATE SET
+                feed=excluded.feed, etag=NULL, last_modified=NULL, items=NULL WHERE feed IS NOT excluded.feed""",
+                       (page, feed))
+
+    def put(self, page, items, etag=None, last_modified=None):
+        with closing(self._db()) as db:
+            db.execute("UPDATE feeds SET items=?, etag=?, last_modified=?, checked_at=? WHERE page=?",
+                       (json.dumps(items), etag, last_modified, time.time(), page))
+
+    def touch(self, page):
+        with closing(self._db()) as db:
+            db.execute("UPDATE feeds SET checked_at=? WHERE page=?", (time.time(), page))
+
+_default_registry = None
+_registry_lock = threading.Lock()
+
+def get_feed_registry() -> FeedRegistry:
+    global _default_registry
+    with _registry_lock:
+        if _default_registry is None: _default_registry = FeedRegistry()
+        return _default_registry
+
+def discover_feed(candidates, base):
+    # Primer <link rel="alternate"> de tipo RSS/Atom de la portada, como URL absoluta
+    for attrs in candidates:
+        rel = (attrs.get("rel") or "").lower().split()
+        if "alternate" in rel and (attrs.get("type") or "").lower().split(";")[0].strip() in FEED_TYPES \
+                and attrs.get("href"):
+            return urljoin(base, attrs["href"].strip())
+    return None
+
+# ---- Parser incremental ----
+def _local(tag):
+    return tag.rsplit("}", 1)[-1] if isinstance(tag, str) else ""
+
+def _date(text):
+    # RFC 822 (RSS) o ISO 8601 (Atom, dc:date) -> "AAAA-MM-DD"
+    text = (text or "").strip()
+    if not text: return None
+    try:
+        d = parsedate_to_datetime(text)
+    except (TypeError, ValueError, IndexError):
+        try:
+            d = datetime.fromisoformat(text.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if d.tzinfo is not None: d = d.astimezone(timezone.utc)
+    return d.date().isoformat()
+
+def _entry(el, base):
+    title, url, published = "", None, None
+    for child in el:
+        name = _local(child.tag)
+        if name == "title":
+            title = " ".join("".join(child.itertext()).split())
+        elif name == "link":
+            # RSS: <link>url</link>; Atom: <link rel="alternate" href="url"/>
+            href = child.get("href")
+            if href is None: href = (child.text or "").strip()
+            if href and (url is None or child.get("rel", "alternate") == "alternate"): url = href
+        elif name in ("pubDate", "published", "date", "issued"):
+            published = _date(child.text) or published
+        elif name in ("updated", "modified") and published is None:
+            published = _date(child.text)
+    if not url or not title: return None
+    return {"title": title, "url": urljoin(base, url), "source": base, "published": published}
+
+def parse_feed(chunks, base, max_items=FEED_MAX_ITEMS, max_bytes=FEED_MAX_BYTES) -> list:
+    # RSS 2.0/1.0 (<item>) y Atom (<entry>): cada entrada se lee al cerrarse y se libera
+    p, items, seen = XMLPullParser(events=("end",)), [], 0
+    for chunk in ([chunks] if isinstance(chunks, (bytes, str)) else chunks):
+        p.feed(chunk); seen += len(chunk)
+        for _, el in p.read_events():
+            if _local(el.tag) not in ("item", "entry"): continue
+            it = _entry(el, base)
+            el.clear()
+            if it: items.append(it)
+            if len(items) >= max_items: return items
+        if seen >= max_bytes: return items
+    p.close()
+    return items
+
+def fetch_feed(page, feed, timeout, registry=None) -> list:
+    # GET condicional: con 304 se devuelven los items guardados
+    registry = registry or get_feed_registry()
+    state = registry.get(page) or {}
+    usable = state.get("feed") == feed and state.get("items") is not None
+    headers = {}
+    if usable:
+        if state["etag"]: headers["If-None-Match"] = state["etag"]
+        if state["last_modified"]: headers["If-Modified-Since"] = state["last_modified"]
+    with get_client().stream("GET", feed, timeout=timeout, headers=headers) as r:
+        if r.status_code == 304 and usable:
+            count("feed.not_modified")
+            registry.touch(page)
+            return state["items"]
+        r.raise_for_status()
+        try:
+            items = parse_feed(r.iter_content(CHUNK_SIZE), feed)
+        except ParseError:
+            count("feed.invalid")
+            raise
+        etag, last_modified = r.headers.get("ETag"), r.headers.get("Last-Modified")
+    count("feed.fetched")
+    registry.put(page, items, etag, last_modified)
+    return items
@@ -0,0 +1,127 @@
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from helpers import CACHE_DIR
+from http_client import RETRY_STATUS_UNSAFE, connect_failed, get_client
+
+# ---- COLA DE ENVÍOS AL GOOGLE FORM ----
+# Las altas se guardan en un outbox SQLite y un hilo en segundo plano las envía con reintentos.
+# La clave de idempotencia es el hash del registro (columna -> valor; por defecto el payload):
+# un doble clic no crea dos filas en el Sheet.
+# Sólo se reintenta solo lo que seguro no llegó al Form (fallo al conectar, 429/503). Si el envío
+# salió y no hubo respuesta clara (timeout de lectura, conexión cortada, 5xx) queda "unknown":
+# la fila pudo crearse y reintentarlo es decisión del usuario (volver a enviar el mismo alta).
+OUTBOX_DB = os.path.join(CACHE_DIR, "outbox.sqlite")
+OUTBOX_MAX_ATTEMPTS = 6
+OUTBOX_BACKOFF = 5.0        # s, se duplica en cada intento fallido (más jitter)
+OUTBOX_BACKOFF_MAX = 600.0
+OUTBOX_POLL = 2.0
+OUTBOX_STALE_SENDING = 120.0
+FORM_OK_STATUS = (200, 302)
+
+def idempotency_key(url, record) -> str:
+    raw = json.dumps([url, record], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+class FormQueue:
+    def __init__(self, path=OUTBOX_DB, max_attempts=OUTBOX_MAX_ATTEMPTS):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path, self.max_attempts = path, max_attempts
+        self._wake = threading.Event()
+        self._thread = None
+        with closing(self._db()) as db:
+            db.execute("""CREATE TABLE IF NOT EXISTS outbox (
+                id TEXT PRIMARY KEY, url TEXT, payload TEXT, label TEXT, status TEXT,
+                attempts INTEGER DEFAULT 0, last_error TEXT,
+                created_at REAL, updated_at REAL, next_attempt REAL)""")
+            # Lo que quedó a medias en un proceso anterior (caído) pudo llegar a enviarse
+            db.execute("UPDATE outbox SET status='unknown', last_error='envío interrumpido' "
+                       "WHERE status='sending' AND updated_at<?", (time.time() - OUTBOX_STALE_SENDING,))
+
+    def _db(self):
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def enqueue(self, url, payload, label="", record=None) -> tuple:
+        # Devuelve (clave, nuevo). Si ya estaba en cola o enviado no se duplica;
+        # si había fallado definitivamente o quedó sin confirmar, se vuelve a intentar.
+        # record (columna -> valor) identifica el alta aunque el payload vaya por entry.xxx
+        key, now = idempotency_key(url, payload if record is None else record), time.time()
+        with closing(self._db()) as db:
+            cur = db.execute(
+                "INSERT OR IGNORE INTO outbox VALUES (?,?,?,?,'queued',0,NULL,?,?,?)",
+                (key, url, json.dumps(payload, ensure_ascii=False, default=str), label, now, now, now))
+            created = cur.rowcount == 1
+            if not created:
+                created = db.execute(
+                    "UPDATE outbox SET status='queued', attempts=0, next_attempt=?, updated_at=? "
+                    "WHERE id=? AND status IN ('failed','unknown')", (now, now, key)).rowcount == 1
+        self._wake.set()
+        return key, created
+
+    def _claim(self):
+        now = time.time()
+        with closing(self._db()) as db:
+            row = db.execute(
+                "SELECT id, url, payload, attempts FROM outbox WHERE status='queued' AND next_attempt<=? "
+                "ORDER BY created_at LIMIT 1", (now,)).fetchone()
+            if row is None: return None
+            claimed = db.execute("UPDATE outbox SET status='sending', updated_at=? WHERE id=? AND status='queued'",
+                                 (now, row[0])).rowcount == 1
+        return row if claimed else self._claim()
+
+    def process_once(self) -> bool:
+        row = self._claim()
+        if row is None: return False
+        key, url, payload, attempts = row
+        try:
+            r = get_client().post(url, data=json.loads(payload),
+                                  headers={"Content-Type": "application/x-www-form-urlencoded"}, timeout=20)
+            error = None if r.status_code in FORM_OK_STATUS else f"status {r.status_code}"
+            outcome = ("sent" if error is None else "retry" if r.status_code in RETRY_STATUS_UNSAFE
+                       else "unknown" if r.status_code >= 500 else "failed")
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            outcome = "retry" if connect_failed(e) else "unknown"
+        now, attempts = time.time(), attempts + 1
+        with closing(self._db()) as db:
+            if outcome == "sent":
+                db.execute("UPDATE outbox SET status='sent', attempts=?, last_error=NULL, updated_at=? WHERE id=?",
+                           (attempts, now, key))
+            elif outcome == "retry" and attempts < self.max_attempts:
+                delay = random.uniform(0.5, 1.0) * min(OUTBOX_BACKOFF_MAX, OUTBOX_BACKOFF * 2 ** (attempts - 1))
+                db.execute("UPDATE outbox SET status='queued', attempts=?, last_error=?, updated_at=?, next_attempt=? "
+                           "WHERE id=?", (attempts, error, now, now + delay, key))
+            else:
+                db.execute("UPDATE outbox SET status=?, attempts=?, last_error=?, updated_at=? WHERE id=?",
+                           ("unknown" if outcome == "unknown" else "failed", attempts, error, now, key))
+        return True
+
+    def _run(self):
+        while True:
+            try:
+                while self.process_once(): pass
+            except sqlite3.Error:
+                pass
+            self._wake.wait(OUTBOX_POLL); self._wake.clear()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True, name="form-outbox")
+            self._thread.start()
+        return self
+
+    def recent(self, limit=20) -> list:
+        with closing(self._db()) as db:
+            rows = db.execute("SELECT label, status, attempts, last_error, updated_at FROM outbox "
+                              "ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+        return [dict(zip(["label","status","attempts","last_error","updated_at"], r)) for r in rows]
+
+    def status(self, key):
+        with closing(self._db()) as db:
+            row = db.execute("SELECT status FROM outbox WHERE id=?", (key,)).fetchone()
+        return row[0] if row else None
@@ -0,0 +1,18 @@
+import os
+import unicodedata
+
+# Carpeta de las cachés locales (SQLite, snapshots, log de tiempos); se puede mover con
+# OBSERVATORIO_CACHE_DIR, que se lee al importar: hay que fijarla antes de importar la app
+CACHE_DIR = os.environ.get("OBSERVATORIO_CACHE_DIR", ".cache")
+
+# ===================== HELPERS =====================
+def _norm_txt(x: str) -> str:
+    if x is None: return ""
+    s = unicodedata.normalize("NFD", str(x))
+    return "".join(ch for ch in s if unicodedata.category(ch) != "Mn").lower()
+
+def norm_series(s):
+    # _norm_txt vectorizado para columnas de texto (quita marcas diacríticas y pasa a minúsculas)
+    return (s.fillna("").astype(str).str.normalize("NFD")
+            .str.replace("[\u0300-\u036f\u1ab0-\u1aff\u1dc0-\u1dff\u20d0-\u20ff\ufe20-\ufe2f]", "", regex=True)
+            .str.lower())
@@ -0,0 +1,133 @@
+import random
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+from perf import observe
+
+# ---- CLIENTE HTTP COMPARTIDO ----
+# Una sola Session para Sheet, crawler, resúmenes y Google Form: conexiones keep-alive
+# reutilizadas por host, reintentos con backoff exponencial + jitter y métricas por host.
+USER_AGENT = "Mozilla/5.0"
+DEFAULT_TIMEOUT = (5, 20)              # (conexión, lectura) en segundos
+MAX_RESPONSE_BYTES = 10 * 1024 * 1024
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8.0
+RETRY_STATUS = {429, 500, 502, 503, 504}
+# Para POST sólo se reintenta lo que seguro no llegó a procesarse
+RETRY_STATUS_UNSAFE = {429, 503}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+POOL_HOSTS = 32
+POOL_PER_HOST = 8
+
+class ResponseTooLarge(requests.RequestException):
+    pass
+
+def _retry_after(r):
+    v = r.headers.get("Retry-After", "")
+    return min(float(v), BACKOFF_MAX) if v.isdigit() else None
+
+def connect_failed(e) -> bool:
+    # Falló al abrir la conexión (DNS, rechazada, timeout de conexión): la petición no salió
+    if isinstance(e, requests.ConnectTimeout): return True
+    if not isinstance(e, requests.ConnectionError) or not e.args: return False
+    reason = getattr(e.args[0], "reason", e.args[0])
+    return isinstance(reason, (NewConnectionError, ConnectTimeoutError))
+
+class HttpClient:
+    def __init__(self, user_agent=USER_AGENT, timeout=DEFAULT_TIMEOUT, max_bytes=MAX_RESPONSE_BYTES,
+                 retries=MAX_RETRIES, pool_hosts=POOL_HOSTS, pool_per_host=POOL_PER_HOST):
+        self.timeout, self.max_bytes, self.retries = timeout, max_bytes, retries
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = user_agent
+        adapter = HTTPAdapter(pool_connections=pool_hosts, pool_maxsize=pool_per_host, max_retries=0)
+        self.session.mount("http://", adapter); self.session.mount("https://", adapter)
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _record(self, host, **inc):
+        with self._lock:
+            m = self._metrics.setdefault(host, {"requests": 0, "errors": 0, "retries": 0, "bytes": 0, "seconds": 0.0})
+            for k, v in inc.items(): m[k] += v
+        if "seconds" in inc: observe("http.request", inc["seconds"], host=host)
+
+    def _read(self, r, max_bytes):
+        try:
+            cl = r.headers.get("Content-Length", "")
+            if cl.isdigit() and int(cl) > max_bytes:
+                raise ResponseTooLarge(f"{r.url}: {cl} bytes > {max_bytes}")
+            buf = bytearray()
+            for chunk in r.iter_content(64 * 1024):
+                buf += chunk
+                if len(buf) > max_bytes:
+                    raise ResponseTooLarge(f"{r.url}: > {max_bytes} bytes")
+            r._content = bytes(buf)
+        finally:
+            r.close()
+        return r
+
+    def _send(self, method, url, timeout, retries, read, max_bytes=None, **kw) -> requests.Response:
+        method = method.upper()
+        host = urlsplit(url).netloc
+        retries = self.retries if retries is None else retries
+        retry_status = RETRY_STATUS if method in IDEMPOTENT_METHODS else RETRY_STATUS_UNSAFE
+        for attempt in range(retries + 1):
+            t0 = time.perf_counter()
+            try:
+                r = self.session.request(method, url, timeout=timeout or self.timeout, stream=True, **kw)
+                if read: self._read(r, max_bytes or self.max_bytes)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._record(host, requests=1, errors=1, seconds=time.perf_counter() - t0)
+                # Un POST sólo se repite si no llegó a enviarse; si no, pudo haberse procesado
+                if attempt == retries or (method not in IDEMPOTENT_METHODS and not connect_failed(e)):
+                    raise
+                wait = None
+            except requests.RequestException:
+                self._record(host, requests=1, errors=1, seconds=time.perf_counter() - t0)
+                raise
+            else:
+                self._record(host, requests=1, bytes=len(r.content) if read else 0,
+                             seconds=time.perf_counter() - t0, errors=int(r.status_code >= 400))
+                if r.status_code not in retry_status or attempt == retries:
+                    return r
+                if not read: r.close()
+                wait = _retry_after(r)
+            self._record(host, retries=1)
+            time.sleep(wait if wait is not None else random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt)))
+
+    def request(self, method, url, timeout=None, max_bytes=None, retries=None, **kw) -> requests.Response:
+        return self._send(method, url, timeout, retries, read=True, max_bytes=max_bytes, **kw)
+
+    @contextmanager
+    def stream(self, method, url, timeout=None, retries=None, **kw):
+        # Como request() pero sin leer el cuerpo: quien lo consume decide cuándo parar.
+        # Al salir se cierra la conexión (si no se leyó entera no vuelve al pool).
+        r = self._send(method, url, timeout, retries, read=False, **kw)
+        try:
+            yield r
+        finally:
+            self._record(urlsplit(url).netloc, bytes=r.raw.tell() if r.raw is not None else 0)
+            r.close()
+
+    def get(self, url, **kw) -> requests.Response:
+        return self.request("GET", url, **kw)
+
+    def post(self, url, **kw) -> requests.Response:
+        return self.request("POST", url, **kw)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {h: dict(m) for h, m in self._metrics.items()}
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client() -> HttpClient:
+    global _client
+    with _client_lock:
+        if _client is None: _client = HttpClient()
+        return _client
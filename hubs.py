@@ -0,0 +1,60 @@
+import hashlib
+import json
+import re
+import numpy as np
+import pandas as pd
+from helpers import _norm_txt, norm_series
+
+# ---- CLASIFICACIÓN POR HUB ----
+HUB_OPTIONS = [
+    "Sustainable Finance",
+    "Net Zero & PA",
+    "Analytics Data & IA",
+    "Sustainability & reporting",
+]
+
+# Tabla de reglas: una noticia recibe todos los HUB cuyas palabras aparezcan en el título
+# (palabra completa, sin acentos) o cuya fuente esté en la lista. Si no casa ninguna: DEFAULT_HUB.
+HUB_RULES = [
+    {"hub": "Net Zero & PA",
+     "keywords": ["net zero", "net-zero", "paris agreement", "paris alignment", "paris-aligned",
+                  "decarbonisation", "decarbonization", "transition plan", "transition plans",
+                  "financed emissions", "carbon accounting", "pacta", "nzba", "pcaf",
+                  "cero neto", "descarbonización", "plan de transición"],
+     "sources": ["NZBA", "PACTA", "PCAF"]},
+    {"hub": "Analytics Data & IA",
+     "keywords": ["data", "dataset", "datasets", "analytics", "ai", "artificial intelligence",
+                  "machine learning", "scenario analysis", "stress test", "stress testing", "modelling", "modeling",
+                  "datos", "inteligencia artificial"],
+     "sources": []},
+    {"hub": "Sustainability & reporting",
+     "keywords": ["reporting", "report", "disclosure", "disclosures", "csrd", "esrs", "sfdr", "issb",
+                  "taxonomy", "pillar 3", "non-financial", "sustainability",
+                  "taxonomía", "divulgación", "informe", "sostenibilidad"],
+     "sources": []},
+    {"hub": "Sustainable Finance",
+     "keywords": ["sustainable finance", "green bond", "green bonds", "social bond", "sustainability-linked",
+                  "green loan", "esg", "climate risk", "climate-related", "sustainable trade", "principles",
+                  "finanzas sostenibles", "bono verde", "riesgo climático"],
+     "sources": ["ICMA", "ICC"]},
+]
+DEFAULT_HUB = "Sustainable Finance"
+
+def _rule_pattern(words):
+    words = sorted({_norm_txt(w) for w in words}, key=len, reverse=True)
+    alts = "|".join(r"[\s-]+".join(map(re.escape, w.split())) for w in words)
+    return rf"(?<!\w)(?:{alts})(?!\w)"
+
+_COMPILED = [(r["hub"], _rule_pattern(r["keywords"]), set(r["sources"])) for r in HUB_RULES]
+HUB_RULES_VERSION = hashlib.sha1(json.dumps([HUB_RULES, DEFAULT_HUB]).encode()).hexdigest()[:12]
+
+def classify_hubs(titles: pd.Series, sources: pd.Series) -> pd.Series:
+    # Evalúa todas las reglas sobre la columna completa; devuelve una lista de HUB por fila
+    titles = norm_series(pd.Series(titles).reset_index(drop=True))
+    sources = pd.Series(sources).reset_index(drop=True).astype(str)
+    if titles.empty: return pd.Series([], dtype=object)
+    masks = np.column_stack([titles.str.contains(pat, regex=True).to_numpy() | sources.isin(srcs).to_numpy()
+                             for _, pat, srcs in _COMPILED])
+    tags = np.array([hub + "|" for hub, _, _ in _COMPILED], dtype=object)
+    joined = pd.Series(np.where(masks, tags, "").sum(axis=1)).str.rstrip("|").replace("", DEFAULT_HUB)
+    return joined.str.split("|")
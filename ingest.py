@@ -0,0 +1,316 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+import pandas as pd
+from news import DEFAULT_KEYWORDS, NEWS_SOURCES, fetch_sources
+from hubs import HUB_RULES_VERSION, classify_hubs
+from summaries import summarize_urls
+from keywords import compile_keywords
+from perf import count, span
+from dedup import (TITLE_CLUSTER_VERSION, canonical_url, clean_url, same_story, title_bands, title_numbers,
+                   title_shingles)
+from shared_cache import get_shared_cache
+from helpers import CACHE_DIR
+
+# ---- INGESTA PROGRAMADA (What's new) ----
+# Un hilo recorre las fuentes cada NEWS_CRAWL_INTERVAL y guarda los enlaces en un store SQLite.
+# Sólo las URLs nuevas se clasifican y, si casan con las palabras clave, se resumen:
+# el coste de cada pasada depende de lo nuevo, no del total de enlaces.
+# Lo que ya está en el repositorio (known) se marca y no se resume; las variantes de una misma
+# noticia en varias webs se agrupan y sólo se resume una por grupo. El grupo (cluster) se asigna
+# al guardar cada enlace nuevo, comparándolo sólo con los títulos que comparten alguna banda LSH
+# (guardadas en title_bands); leer es agrupar por esa columna.
+# Con varias réplicas, el recorrido de las fuentes pasa por la caché compartida: una sola
+# réplica descarga por intervalo y las demás guardan en su store el mismo resultado.
+NEWS_DB = os.path.join(CACHE_DIR, "news.sqlite")
+NEWS_CRAWL_INTERVAL = 30 * 60
+NEWS_RETENTION = 60 * 24 * 3600   # enlaces no vistos en este tiempo dejan de mostrarse
+NEWS_SUMMARY_SENTENCES = 2
+# Resumen fallido (403, 404, timeout...): no se reintenta hasta pasado este plazo, que se duplica
+# con cada fallo. Los reintentos los hace la pasada en segundo plano, nunca la lectura de la UI.
+NEWS_SUMMARY_RETRY = 30 * 60
+NEWS_SUMMARY_RETRY_MAX = 7 * 24 * 3600
+NEWS_COLUMNS = ["title","url","source","Hub","Resumen","published","cluster","summary_retry"]
+
+class NewsStore:
+    def __init__(self, path=NEWS_DB):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        with closing(self._db()) as db:
+            db.execute("""CREATE TABLE IF NOT EXISTS news (
+                url TEXT PRIMARY KEY, title TEXT, source TEXT, hub TEXT, resumen TEXT,
+                first_seen REAL, last_seen REAL, published TEXT)""")
+            db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            db.execute("CREATE TABLE IF NOT EXISTS title_bands (band INTEGER, key BLOB, url TEXT, "
+                       "PRIMARY KEY (band, key, url)) WITHOUT ROWID")
+            cols = {r[1] for r in db.execute("PRAGMA table_info(news)")}
+            # Stores anteriores a los feeds: fecha de publicación (AAAA-MM-DD) si la fuente la da
+            if "published" not in cols: db.execute("ALTER TABLE news ADD COLUMN published TEXT")
+            # cluster: rowid del primer enlace de su grupo de títulos casi iguales
+            if "cluster" not in cols: db.execute("ALTER TABLE news ADD COLUMN cluster INTEGER")
+            # Resúmenes fallidos: nº de fallos seguidos y cuándo se puede volver a intentar
+            if "summary_retry" not in cols:
+                db.execute("ALTER TABLE news ADD COLUMN summary_failures INTEGER DEFAULT 0")
+                db.execute("ALTER TABLE news ADD COLUMN summary_retry REAL")
+            if self.get_meta("title_clusters", db=db) != TITLE_CLUSTER_VERSION: self._recluster(db)
+
+    def _db(self):
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def _recluster(self, db):
+        # Stores anteriores o parámetros de agrupación distintos: se agrupa todo de una vez
+        with span("news.recluster"):
+            db.execute("BEGIN IMMEDIATE")
+            if self.get_meta("title_clusters", db=db) == TITLE_CLUSTER_VERSION:
+                db.execute("ROLLBACK"); return        # otro proceso acaba de hacerlo
+            # Mismo camino que la ingesta, en orden de llegada: el resultado es el mismo que si
+            # cada enlace se hubiera agrupado al guardarlo
+            db.execute("UPDATE news SET cluster=NULL")
+            db.execute("DELETE FROM title_bands")
+            for row in db.execute("SELECT rowid, url, title, source FROM news ORDER BY rowid").fetchall():
+                self._assign_cluster(db, *row)
+            db.execute("INSERT OR REPLACE INTO meta VALUES ('title_clusters', ?)", (json.dumps(TITLE_CLUSTER_VERSION),))
+            db.execute("COMMIT")
+
+    def _assign_cluster(self, db, rowid, url, title, source):
+        # Grupo de un enlace nuevo: candidatos por bandas LSH, confirmados con same_story. Se une
+        # a los grupos que casan y no tienen ya un enlace de su fuente (fusionados en el más antiguo).
+        feats = (title_shingles(title), title_numbers(title))
+        keys = title_bands(feats[0])
+        cluster = rowid
+        if keys:
+            cands = db.execute("SELECT DISTINCT n.title, n.cluster FROM title_bands b JOIN news n ON n.url=b.url "
+                               f"WHERE {' OR '.join(['(b.band=? AND b.key=?)'] * len(keys))}",
+                               [v for b, key in enumerate(keys) for v in (b, key)]).fetchall()
+            matches = sorted({c for t, c in cands
+                              if c is not None and same_story(feats, (title_shingles(t), title_numbers(t)))})
+            if matches:
+                srcs = {}
+                for c, src in db.execute(f"SELECT cluster, source FROM news WHERE cluster IN "
+                                         f"({', '.join('?' * len(matches))})", matches):
+                    srcs.setdefault(c, set()).add(src)
+                taken, chosen = {source}, []
+                for c in matches:
+                    if taken.isdisjoint(srcs.get(c, ())):
+                        chosen.append(c); taken |= srcs.get(c, set())
+                if chosen:
+                    cluster = chosen[0]
+                    if chosen[1:]: db.execute(f"UPDATE news SET cluster=? WHERE cluster IN ({', '.join('?' * (len(chosen) - 1))})",
+                                              (cluster, *chosen[1:]))
+            db.executemany("INSERT OR IGNORE INTO title_bands VALUES (?,?,?)", ((b, key, url) for b, key in enumerate(keys)))
+        db.execute("UPDATE news SET cluster=? WHERE rowid=?", (cluster, rowid))
+
+    def add(self, items) -> list:
+        # Inserta lo que no estaba (y le asigna grupo) y refresca last_seen del resto; devuelve sólo lo nuevo
+        now, new = time.time(), []
+        with closing(self._db()) as db:
+            db.execute("BEGIN")
+            for it in items:
+                published = it.get("published")
+                cur = db.execute("INSERT OR IGNORE INTO news (url, title, source, first_seen, last_seen, published) "
+                                 "VALUES (?,?,?,?,?,?)",
+                                 (it["url"], it["title"], it["source"], now, now, published))
+                if cur.rowcount == 1:
+                    new.append(it)
+                    self._assign_cluster(db, cur.lastrowid, it["url"], it["title"], it["source"])
+                else: db.execute("UPDATE news SET last_seen=?, published=COALESCE(?, published) WHERE url=?",
+                                 (now, published, it["url"]))
+            db.execute("COMMIT")
+        return new
+
+    def set_summaries(self, summaries: dict):
+        # {url: resumen | None}; None es un fallo: se aplaza el siguiente intento (backoff exponencial)
+        now = time.time()
+        with closing(self._db()) as db:
+            db.execute("BEGIN")
+            db.executemany("UPDATE news SET resumen=?, summary_failures=0, summary_retry=NULL WHERE url=?",
+                           [(v, u) for u, v in summaries.items() if v is not None])
+            db.executemany("UPDATE news SET summary_retry=? + MIN(?, ? * (1 << MIN(COALESCE(summary_failures, 0), 20))), "
+                           "summary_failures=COALESCE(summary_failures, 0) + 1 WHERE url=?",
+                           [(now, NEWS_SUMMARY_RETRY_MAX, NEWS_SUMMARY_RETRY, u) for u, v in summaries.items() if v is None])
+            db.execute("COMMIT")
+
+    def update_many(self, column, values):
+        # values: [(valor, url), ...] en una sola transacción
+        with closing(self._db()) as db:
+            db.execute("BEGIN")
+            db.executemany(f"UPDATE news SET {column}=? WHERE url=?", values)
+            db.execute("COMMIT")
+
+    def update(self, url, **fields):
+        cols = ", ".join(f"{k}=?" for k in fields)
+        with closing(self._db()) as db:
+            db.execute(f"UPDATE news SET {cols} WHERE url=?", (*fields.values(), url))
+
+    def frame(self, since=None) -> pd.DataFrame:
+        since = time.time() - NEWS_RETENTION if since is None else since
+        with closing(self._db()) as db:
+            rows = db.execute("SELECT title, url, source, hub, resumen, published, cluster, summary_retry FROM news "
+                              "WHERE last_seen>=? "
+                              "ORDER BY first_seen DESC, rowid", (since,)).fetchall()
+        return pd.DataFrame(rows, columns=NEWS_COLUMNS)
+
+    def get_meta(self, key, default=None, db=None):
+        if db is not None:
+            row = db.execute("SELECT value FROM meta WHERE key=?", (key,)).fetchone()
+            return json.loads(row[0]) if row else default
+        with closing(self._db()) as db:
+            return self.get_meta(key, default, db)
+
+    def set_meta(self, key, value):
+        with closing(self._db()) as db:
+            db.execute("INSERT OR REPLACE INTO meta VALUES (?,?)", (key, json.dumps(value)))
+
+def _group_lists(keys, values) -> pd.Series:
+    # {grupo: [valores]} en orden de aparición; mucho más rápido que un agg(lambda) por grupo
+    out = {}
+    for k, v in zip(keys, values): out.setdefault(k, []).append(v)
+    return pd.Series(out, dtype=object)
+
+def collapse_variants(df, known=()) -> pd.DataFrame:
+    # Una fila por grupo de títulos casi iguales (columna cluster del store). Representante: la
+    # primera variante con resumen (si no, la más reciente). Fuentes/Enlaces/Hub reúnen todo el grupo.
+    df = df.reset_index(drop=True)
+    if df.empty: return df.drop(columns="cluster").assign(Fuentes=[], Enlaces=[], **{"En repositorio": []})
+    # _c numera los grupos por orden de aparición: se conserva el orden del store (más nuevo primero)
+    df = df.assign(_c=df.groupby("cluster", sort=False, dropna=False).ngroup(), _r=df["Resumen"].isna(),
+                   _k=df["url"].map(lambda u: u in known).astype(bool))
+    rep = df.sort_values(["_c","_r"], kind="stable").drop_duplicates("_c").set_index("_c")
+    rep["Fuentes"] = _group_lists(df["_c"], df["source"]).map(lambda l: list(dict.fromkeys(l)))
+    rep["Enlaces"] = _group_lists(df["_c"], df["url"])
+    rep["Hub"] = _group_lists(df["_c"], df["Hub"]).map(
+        lambda l: "|".join(dict.fromkeys(h for v in l if isinstance(v, str) for h in v.split("|") if h)))
+    # La fecha más antigua del grupo es la de la noticia (AAAA-MM-DD se ordena como texto)
+    pub = df.dropna(subset=["published"]).sort_values("published", kind="stable").drop_duplicates("_c")
+    pub = pub.set_index("_c")["published"].reindex(rep.index)
+    rep["published"] = pub.astype(object).where(pub.notna(), None)
+    rep["En repositorio"] = df.groupby("_c", sort=False)["_k"].any()
+    return rep.drop(columns=["_r","_k","cluster"]).reset_index(drop=True)
+
+class NewsIngestor:
+    def __init__(self, store=None, sources=NEWS_SOURCES, keywords=None, interval=NEWS_CRAWL_INTERVAL, known=None,
+                 shared=None):
+        self.store = store or NewsStore()
+        self.shared = shared if shared is not None else get_shared_cache()
+        self.known = known if known is not None else ()
+        self.sources, self.interval = sources, interval
+        self.matcher = compile_keywords(tuple(keywords or DEFAULT_KEYWORDS))
+        self._run_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._force = False
+        self._thread = None
+
+    def classify(self, items):
+        # Clasificación por HUB en bloque (vectorizada); se guarda como "hub1|hub2"
+        if not items: return
+        df = pd.DataFrame(items)
+        hubs = classify_hubs(df["title"], df["source"]).str.join("|")
+        self.store.update_many("hub", list(zip(hubs, df["url"])))
+
+    def summarize(self, items):
+        if not items: return
+        with span("news.summarize"):
+            summaries = summarize_urls([it["url"] for it in items], max_sent=NEWS_SUMMARY_SENTENCES)
+        self.store.set_summaries(summaries)
+
+    def enrich(self, items):
+        # Clasifica y resume una lista de noticias y lo deja guardado en el store
+        self.classify(items); self.summarize(items)
+
+    def _check_rules(self):
+        # Si cambió la tabla de reglas de HUB, se reclasifica todo lo guardado de una vez
+        if self.store.get_meta("hub_rules") == HUB_RULES_VERSION: return
+        df = self.store.frame(since=0)
+        self.classify(df[["url","title","source"]].to_dict("records"))
+        self.store.set_meta("hub_rules", HUB_RULES_VERSION)
+
+    def crawl(self, force=False):
+        # ({fuente: links}, {fuente: motivo}); force ignora lo que otra réplica haya traído antes
+        if self.shared is None: return fetch_sources(self.sources)
+        key = "news:" + hashlib.sha1(json.dumps(self.sources).encode("utf-8")).hexdigest()[:16]
+        raw = self.shared.fetch(key, 0 if force else self.interval,
+                                lambda: json.dumps(fetch_sources(self.sources)).encode("utf-8"))
+        links, failed = json.loads(raw)
+        return links, failed
+
+    def run_once(self, force=False):
+        with self._run_lock, span("news.crawl"):
+            links, failed = self.crawl(force)
+            # Misma noticia con otra URL (utm_*, http/https, barra final...) cuenta una sola vez
+            seen, items = set(), []
+            for label, its in links.items():
+                for it in its:
+                    key = canonical_url(it["url"])
+                    if key in seen: continue
+                    seen.add(key); items.append(dict(it, url=clean_url(it["url"]), source=label))
+            new = self.store.add(items)
+            self.classify(new)
+            # Se resume un representante por cada grupo que haya recibido alguna variante nueva
+            new_urls = {it["url"] for it in new}
+            df = self.store.frame()
+            df = collapse_variants(df[df["title"].map(self.matcher.matches).astype(bool)], self._known())
+            # ...y se reintentan los fallidos cuyo plazo ya venció
+            retry = df["summary_retry"]
+            due = (retry.isna() & df["Enlaces"].map(lambda l: not new_urls.isdisjoint(l))) | (retry <= time.time())
+            todo = df[df["Resumen"].isna() & ~df["En repositorio"] & due]
+            self.summarize(todo[["url","title","source"]].to_dict("records"))
+            self.store.set_meta("last_run", time.time())
+            self.store.set_meta("failed", failed)
+            return len(new)
+
+    def _known(self):
+        # Índice del repositorio en este momento (se rehace si cambió la versión del Sheet)
+        return self.known.current() if hasattr(self.known, "current") else self.known
+
+    def _run(self):
+        while True:
+            force, self._force = self._force, False
+            try:
+                self.run_once(force)
+            except Exception:
+                pass
+            self._wake.wait(self.interval); self._wake.clear()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True, name="news-ingest")
+            self._thread.start()
+        return self
+
+    def trigger(self, force=True):
+        # "Rastrear ahora": recorre las fuentes aunque otra réplica lo haya hecho hace poco
+        self._force = self._force or force
+        self._wake.set()
+
+    @property
+    def last_run(self):
+        return self.store.get_meta("last_run")
+
+    def news(self, kws):
+        # Lectura para la UI: lo guardado que casa con kws; sólo se resume lo que aún no tenga resumen
+        if self.last_run is None:
+            count("fetch_all_news.cold")
+            with self._run_lock: pass          # espera a la primera pasada si ya está en marcha
+            if self.last_run is None: self.run_once()
+        self._check_rules()
+        matcher = compile_keywords(tuple(kws))
+        known = self._known()
+        df = self.store.frame()
+        df = df[df["title"].map(matcher.matches).astype(bool)]
+        news = collapse_variants(df, known)
+        # Sólo lo nunca intentado (p. ej. casa con palabras clave nuevas); los fallidos esperan a run_once
+        pending = news[news["Resumen"].isna() & ~news["En repositorio"] & news["summary_retry"].isna()]
+        # hit: todo servido del store; miss: noticias que hubo que resumir ahora
+        count("fetch_all_news.miss" if len(pending) else "fetch_all_news.hit")
+        if not pending.empty:
+            self.enrich(pending[["url","title","source"]].to_dict("records"))
+            news = collapse_variants(self.store.frame().loc[lambda d: d["url"].isin(df["url"])], known)
+        df = news.drop(columns="summary_retry")
+        df["Hub"] = df["Hub"].fillna("").str.split("|")
+        df["Resumen"] = df["Resumen"].fillna("")
+        df["Palabras clave"] = df["title"].map(matcher.find)
+        return df, self.store.get_meta("failed", {})
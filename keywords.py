@@ -0,0 +1,49 @@
+import re
+from functools import lru_cache
+from helpers import _norm_txt
+
+# ---- PALABRAS CLAVE ----
+# Las palabras se normalizan (sin acentos, minúsculas, sin espacios sobrantes) una sola vez
+# y se compilan en una única regex para filtrar; sólo los títulos que casan se miran palabra a palabra.
+_SEP_RE = re.compile(r"[\s-]+")
+
+def _norm_keyword(k) -> str:
+    return " ".join(w for w in _SEP_RE.split(_norm_txt(k)) if w)
+
+def parse_keywords(text: str) -> tuple:
+    return tuple(k.strip() for k in str(text).split(",") if k.strip())
+
+class KeywordMatcher:
+    # whole_word=False: la palabra debe empezar en límite de palabra ("risk" casa con "risks"
+    # pero "esg" no casa dentro de "desgaste"); whole_word=True exige la palabra completa.
+    # Las frases ("net zero") toleran espacios o guiones entre sus términos ("Net-zero"), como
+    # las reglas de hubs.
+    def __init__(self, keywords, whole_word=False):
+        norm = {}
+        for k in keywords:
+            nk = _norm_keyword(k)
+            if nk: norm.setdefault(nk, " ".join(str(k).split()))
+        self.keywords = list(norm.values())
+        end = r"(?!\w)" if whole_word else ""
+        pattern = lambda nk: r"[\s-]+".join(map(re.escape, nk.split()))
+        # Una regex por palabra para find(): con una sola alternancia, finditer no ve los aciertos
+        # que se solapan ("zero" dentro de "net zero")
+        self._each = [(k, re.compile(rf"(?<!\w){pattern(nk)}{end}")) for nk, k in norm.items()]
+        if not norm:
+            self._re = None; return
+        alts = "|".join(pattern(nk) for nk in sorted(norm, key=len, reverse=True))
+        self._re = re.compile(rf"(?<!\w)(?:{alts}){end}")
+
+    def find(self, title) -> list:
+        # Palabras clave (tal como se escribieron, en su orden) que aparecen en el título
+        if self._re is None: return []
+        t = _norm_txt(title)
+        if self._re.search(t) is None: return []
+        return [k for k, rx in self._each if rx.search(t)]
+
+    def matches(self, title) -> bool:
+        return self._re is not None and self._re.search(_norm_txt(title)) is not None
+
+@lru_cache(maxsize=64)
+def compile_keywords(keywords: tuple, whole_word=False) -> KeywordMatcher:
+    return KeywordMatcher(keywords, whole_word=whole_word)
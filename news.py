@@ -0,0 +1,74 @@
+from crawler import CRAWL_DEPTH, Crawler, follow_links
+from extraction import extract_page, iter_text
+from feeds import discover_feed, fetch_feed, get_feed_registry
+from http_client import get_client
+from perf import count, span
+
+# ---- FUENTES (What's new) ----
+NEWS_SOURCES = [
+    ("PCAF","https://carbonaccountingfinancials.com/en/news-events"),
+    ("NZBA","https://www.unepfi.org/net-zero-banking/"),
+    ("PACTA","https://pacta.rmi.org/"),
+    ("EBA","https://www.eba.europa.eu/homepage"),
+    ("ECB","https://www.ecb.europa.eu/ecb/climate/html/index.en.html"),
+    ("ESMA","https://www.esma.europa.eu/esmas-activities/sustainable-finance"),
+    ("ICC","https://iccwbo.org/news-publications/policies-reports/icc-principles-for-sustainable-trade/?utm_source=chatgpt.com"),
+    ("ICMA","https://www.icmagroup.org/sustainable-finance/the-principles-guidelines-and-handbooks/"),
+    ("CE","https://single-market-economy.ec.europa.eu/industry/sustainability_en"),
+    ("BIS","https://www.bis.org/"),
+]
+
+# Límites del crawl: nº de descargas simultáneas, plazo global y plazo por fuente (segundos)
+NEWS_MAX_WORKERS = 6
+NEWS_DEADLINE = 30
+NEWS_SOURCE_TIMEOUT = 20
+
+DEFAULT_KEYWORDS = ["climate","esg","sustainable","transition","risk","net zero"]
+
+def _fetch_source(url, timeout, label=None, registry=None):
+    # Feed primero (GET condicional); la portada sólo si no tiene feed o el feed falla.
+    # La portada se parsea según se descarga, sin guardar el HTML completo, y de paso se
+    # busca en su cabecera un feed para las siguientes pasadas.
+    # Devuelve (links, páginas a seguir); con feed no se sigue nada: ya trae lo último.
+    registry = registry or get_feed_registry()
+    with span("news.source", source=label or url):
+        feed = (registry.get(url) or {}).get("feed")
+        if feed:
+            try:
+                return fetch_feed(url, feed, timeout, registry), []
+            except Exception:
+                count("feed.fallback", source=label or url)
+        links, heads, nav = _scrape(url, timeout)
+        found = discover_feed(heads, url)
+        registry.set_feed(url, found)
+        if found and found != feed:
+            try:
+                return fetch_feed(url, found, timeout, registry), []
+            except Exception:
+                count("feed.fallback", source=label or url)
+        return links, follow_links(url, links + nav, heads)
+
+def _scrape(url, timeout):
+    with get_client().stream("GET", url, timeout=timeout) as r:
+        r.raise_for_status()
+        return extract_page(iter_text(r), url)
+
+def _fetch_page(url, timeout, label=None):
+    # Subpágina (paginación, listados): sólo enlaces, sin feeds
+    with span("news.page", source=label or url):
+        links, heads, nav = _scrape(url, timeout)
+        return links, follow_links(url, links + nav, heads)
+
+def fetch_sources(sources=NEWS_SOURCES, max_workers=NEWS_MAX_WORKERS,
+                  deadline=NEWS_DEADLINE, source_timeout=NEWS_SOURCE_TIMEOUT, registry=None,
+                  depth=CRAWL_DEPTH, robots=None, limiter=None):
+    # Crawl con límites por host (crawler.Crawler). Devuelve ({fuente: links}, {fuente: motivo})
+    # con lo que haya llegado antes del plazo global; las fuentes lentas, caídas o vetadas por
+    # robots.txt quedan en el segundo dict.
+    # Cada link: {title, url, source, published}; published (AAAA-MM-DD) sólo llega de los feeds.
+    registry = registry or get_feed_registry()
+    def fetch(url, level, label):
+        if level == 0: return _fetch_source(url, source_timeout, label, registry)
+        return _fetch_page(url, source_timeout, label)
+    return Crawler(fetch, depth=depth, max_workers=max_workers, deadline=deadline, robots=robots,
+                   limiter=limiter).run(sources)
@@ -0,0 +1,99 @@
+import atexit
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from helpers import CACHE_DIR
+
+# ---- MÉTRICAS DE RENDIMIENTO ----
+# span("fase") mide cuánto tarda cada etapa (descarga del Sheet, read_csv, filtros, gráficos,
+# cada petición HTTP...) y count("x.hit") lleva contadores de caché. Todo queda en memoria para
+# el panel de la barra lateral y se vuelca por lotes a un JSON-lines rotativo (una línea por medida).
+# OBSERVATORIO_PERF_LOG="" desactiva el fichero.
+PERF_LOG = os.environ.get("OBSERVATORIO_PERF_LOG", os.path.join(CACHE_DIR, "perf.jsonl"))
+PERF_LOG_MAX_BYTES = 5 * 1024 * 1024   # al pasar de aquí se rota a perf.jsonl.1
+PERF_FLUSH_EVERY = 5.0                 # s entre volcados
+PERF_WINDOW = 200                      # últimas medidas por métrica para percentiles
+
+def _key(name, labels):
+    if not labels: return name
+    return name + "{" + ",".join(f"{k}={labels[k]}" for k in sorted(labels)) + "}"
+
+class Recorder:
+    def __init__(self, path=PERF_LOG, window=PERF_WINDOW):
+        self.path, self.window = path, window
+        self._timings, self._counters, self._pending = {}, {}, []
+        self._lock = threading.Lock()
+        self._flushed_at = time.time()
+
+    def observe(self, name, seconds, **labels):
+        key, now = _key(name, labels), time.time()
+        with self._lock:
+            self._timings.setdefault(key, deque(maxlen=self.window)).append(seconds)
+            if self.path: self._pending.append({"t": round(now, 3), "span": name, "ms": round(seconds * 1000, 3), **labels})
+        if now - self._flushed_at >= PERF_FLUSH_EVERY: self.flush()
+
+    def count(self, name, n=1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + n
+            if self.path: self._pending.append({"t": round(time.time(), 3), "counter": name, "n": n, **labels})
+
+    @contextmanager
+    def span(self, name, **labels):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0, **labels)
+
+    def flush(self):
+        with self._lock:
+            lines, self._pending, self._flushed_at = self._pending, [], time.time()
+        if not lines or not self.path: return
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            if os.path.exists(self.path) and os.path.getsize(self.path) > PERF_LOG_MAX_BYTES:
+                os.replace(self.path, self.path + ".1")
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("".join(json.dumps(l, ensure_ascii=False, default=str) + "\n" for l in lines))
+        except OSError:
+            pass
+
+    def timings(self) -> list:
+        # [{métrica, n, última, media, p95, máx}] en ms sobre la ventana reciente
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._timings.items()]
+        out = []
+        for k, v in sorted(items):
+            s = sorted(v)
+            out.append({"métrica": k, "n": len(v), "última_ms": round(v[-1] * 1000, 1),
+                        "media_ms": round(sum(v) / len(v) * 1000, 1),
+                        "p95_ms": round(s[min(len(s) - 1, int(len(s) * 0.95))] * 1000, 1),
+                        "máx_ms": round(s[-1] * 1000, 1)})
+        return out
+
+    def counters(self) -> dict:
+        with self._lock:
+            return dict(sorted(self._counters.items()))
+
+    def reset(self):
+        with self._lock:
+            self._timings.clear(); self._counters.clear()
+
+_recorder = Recorder()
+atexit.register(_recorder.flush)
+
+def get_recorder() -> Recorder:
+    return _recorder
+
+def span(name, **labels):
+    return _recorder.span(name, **labels)
+
+def observe(name, seconds, **labels):
+    _recorder.observe(name, seconds, **labels)
+
+def count(name, n=1, **labels):
+    _recorder.count(name, n, **labels)
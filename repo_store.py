@@ -0,0 +1,177 @@
+import json
+import os
+import sqlite3
+import threading
+from contextlib import closing
+import numpy as np
+import pandas as pd
+from helpers import CACHE_DIR
+from sheet import COLUMNS, DATE_COLUMNS, UG_COLUMNS
+from facets import FACET_COLUMNS
+from search import SEARCH_COLUMNS, SEARCH_WEIGHTS, tokenize
+from perf import span
+
+# ---- REPOSITORIO EN SQLITE (opcional) ----
+# Copia local de la BBDD en un fichero SQLite que comparten todos los procesos de Streamlit.
+# Se reescribe cuando cambia la versión del Sheet (una sola vez aunque haya varios procesos)
+# y los filtros, recuentos, KPIs, gráficos y la página visible se resuelven con SQL.
+# "pos" es la posición de la fila en el Sheet. La búsqueda libre va en una tabla FTS5 (sin
+# acentos, por prefijo) con los mismos pesos por columna que search.SearchIndex, así que el
+# proceso no necesita tener el df ni un índice en memoria. Se activa con OBSERVATORIO_SQL_STORE=1.
+REPO_DB = os.path.join(CACHE_DIR, "repositorio.sqlite")
+SQL_STORE = os.environ.get("OBSERVATORIO_SQL_STORE", "") not in ("", "0")
+
+def _q(col):
+    return '"' + col.replace('"', '""') + '"'
+
+def _sql_value(col, v):
+    if v is None or v is pd.NaT or (not isinstance(v, (str, bool)) and pd.isna(v)): return None
+    if col in UG_COLUMNS: return int(v)
+    if col in DATE_COLUMNS: return pd.Timestamp(v).strftime("%Y-%m-%d")
+    if isinstance(v, (int, np.integer)): return int(v)
+    return str(v)
+
+class RepositoryStore:
+    def __init__(self, path=REPO_DB, facets=FACET_COLUMNS):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path, self.facets = path, list(facets)
+        self._lock = threading.Lock()
+        with closing(self._db()) as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def _db(self, ranked=None):
+        # Con búsqueda libre, sus posiciones van a una tabla temporal de la conexión
+        # (un único volcado por consulta en vez de parsear el JSON en cada subconsulta)
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        if ranked is not None:
+            db.execute("CREATE TEMP TABLE hits (pos INTEGER PRIMARY KEY)")
+            db.executemany("INSERT OR IGNORE INTO hits VALUES (?)", ((int(p),) for p in ranked))
+        return db
+
+    @property
+    def version(self):
+        with closing(self._db()) as db:
+            row = db.execute("SELECT value FROM meta WHERE key='version'").fetchone()
+        return row[0] if row else None
+
+    def mirror(self, df: pd.DataFrame, version: str) -> bool:
+        # Vuelca df si la copia en disco es de otra versión. Se escribe en docs_new y se
+        # renombra dentro de la misma transacción: los lectores ven la versión vieja o la nueva.
+        if version is None or self.version == version: return False
+        with self._lock, span("repo_store.mirror"), closing(self._db()) as db:
+            db.execute("BEGIN IMMEDIATE")
+            if db.execute("SELECT value FROM meta WHERE key='version'").fetchone() == (version,):
+                db.execute("ROLLBACK"); return False
+            db.execute("DROP TABLE IF EXISTS docs_new")
+            db.execute(f"CREATE TABLE docs_new (pos INTEGER PRIMARY KEY, {', '.join(_q(c) for c in COLUMNS)})")
+            cols = [df[c].astype(object).tolist() for c in COLUMNS]
+            db.executemany(f"INSERT INTO docs_new VALUES (?{', ?' * len(COLUMNS)})",
+                           ([i] + [_sql_value(c, col[i]) for c, col in zip(COLUMNS, cols)] for i in range(len(df))))
+            # FTS5 sin contenido propio (el texto ya está en docs): rowid = pos
+            db.execute("DROP TABLE IF EXISTS docs_fts_new")
+            db.execute(f"CREATE VIRTUAL TABLE docs_fts_new USING fts5({', '.join(_q(c) for c in SEARCH_COLUMNS)}, "
+                       f"content='', tokenize='unicode61 remove_diacritics 2')")
+            db.execute(f"INSERT INTO docs_fts_new (rowid, {', '.join(_q(c) for c in SEARCH_COLUMNS)}) "
+                       f"SELECT pos, {', '.join(_q(c) for c in SEARCH_COLUMNS)} FROM docs_new")
+            db.execute("DROP TABLE IF EXISTS docs")
+            db.execute("DROP TABLE IF EXISTS docs_fts")
+            db.execute("ALTER TABLE docs_new RENAME TO docs")
+            db.execute("ALTER TABLE docs_fts_new RENAME TO docs_fts")
+            for i, c in enumerate(self.facets):
+                db.execute(f"CREATE INDEX idx_docs_{i} ON docs ({_q(c)})")
+            db.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (version,))
+            db.execute("COMMIT")
+        return True
+
+    # ---- Consultas ----
+    def search(self, query: str):
+        # Como SearchIndex.search: AND entre términos, cada uno por prefijo, de más a menos
+        # relevante (bm25 con los pesos de columna). Sin términos no se filtra (None)
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens: return None
+        weights = ", ".join(str(SEARCH_WEIGHTS.get(c, 1.0)) for c in SEARCH_COLUMNS)
+        with closing(self._db()) as db:
+            return np.fromiter((r[0] for r in db.execute(
+                f"SELECT rowid FROM docs_fts WHERE docs_fts MATCH ? ORDER BY bm25(docs_fts, {weights}), rowid",
+                (" ".join(f'"{t}"*' for t in tokens),))), dtype=np.int64)
+
+    def links(self) -> list:
+        with closing(self._db()) as db:
+            return [r[0] for r in db.execute(f"SELECT {_q('Link')} FROM docs WHERE {_q('Link')} IS NOT NULL")]
+
+    def _where(self, selections: dict, ranked=None, exclude=None, extra=()):
+        # WHERE común: OR dentro de cada faceta (IN), AND entre facetas; la búsqueda libre
+        # llega como posiciones ya calculadas en la tabla temporal hits (ver _db)
+        clauses, params = list(extra), []
+        for col, values in selections.items():
+            if values and col != exclude:
+                clauses.append(f"{_q(col)} IN ({', '.join('?' * len(values))})")
+                params += [_sql_value(col, v) for v in values]
+        if ranked is not None:
+            clauses.append("pos IN hits")
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def options(self) -> dict:
+        with closing(self._db()) as db:
+            return {c: [r[0] for r in db.execute(f"SELECT DISTINCT {_q(c)} FROM docs WHERE {_q(c)} IS NOT NULL "
+                                                 f"ORDER BY {_q(c)}")] for c in self.facets}
+
+    def counts(self, selections: dict, ranked=None) -> dict:
+        # Igual que FacetIndex.counts: cada faceta se cuenta sin su propia selección
+        out = {}
+        with closing(self._db(ranked)) as db:
+            for c in self.facets:
+                where, params = self._where(selections, ranked, exclude=c)
+                out[c] = dict(db.execute(f"SELECT {_q(c)}, COUNT(*) FROM docs{where} GROUP BY {_q(c)}", params).fetchall())
+        return out
+
+    def rows(self, selections: dict, ranked=None) -> np.ndarray:
+        # Posiciones filtradas; con búsqueda, en orden de relevancia
+        where, params = self._where(selections, ranked)
+        with closing(self._db(ranked)) as db:
+            pos = np.fromiter((r[0] for r in db.execute(f"SELECT pos FROM docs{where} ORDER BY pos", params)), dtype=np.int64)
+        return pos if ranked is None else ranked[np.isin(ranked, pos)]
+
+    def overview(self, selections: dict, ranked=None) -> dict:
+        # Mismo resultado que aggregates.overview, calculado en SQLite
+        where, params = self._where(selections, ranked)
+        year, tema, auth = _q("Año publicación"), _q("Tema ESG"), _q("Autoridad emisora")
+        def grouped(col):
+            w, p = self._where(selections, ranked, extra=[f"{col} IS NOT NULL"])
+            return pd.read_sql_query(f"SELECT {col}, COUNT(*) AS n FROM docs{w} GROUP BY {col} ORDER BY {col}", db, params=p)
+        with closing(self._db(ranked)) as db:
+            total, n_years, n_temas, n_auth = db.execute(
+                f"SELECT COUNT(*), COUNT(DISTINCT {year}), COUNT(DISTINCT {tema}), COUNT(DISTINCT {auth}) "
+                f"FROM docs{where}", params).fetchone()
+            by_year, by_tema = grouped(year), grouped(tema)
+        return {
+            "kpis": {"Total documentos": total, "Años distintos": n_years,
+                     "Temas ESG": n_temas, "Autoridades emisoras": n_auth},
+            "by_year": by_year,
+            "by_tema": by_tema,
+        }
+
+    def page(self, positions, columns=None) -> pd.DataFrame:
+        # Filas pedidas (en ese orden) con los tipos del esquema: fechas, booleanos UG, años
+        columns = list(columns or COLUMNS)
+        positions = [int(p) for p in positions]
+        with closing(self._db()) as db:
+            df = pd.read_sql_query(
+                f"SELECT d.pos, {', '.join('d.' + _q(c) for c in columns)} FROM json_each(?) j "
+                f"JOIN docs d ON d.pos = j.value ORDER BY j.key", db, params=(json.dumps(positions),))
+        for c in columns:
+            if c in DATE_COLUMNS: df[c] = pd.to_datetime(df[c], format="%Y-%m-%d", errors="coerce")
+            elif c in UG_COLUMNS: df[c] = df[c].fillna(0).astype(bool)
+            elif c == "Año publicación": df[c] = df[c].astype("Int16")
+        return df.set_index("pos").rename_axis(None)
+
+    def sort(self, rows, sort_by, ascending=True) -> np.ndarray:
+        # Orden en SQLite (NULL al final) sobre las posiciones ya filtradas
+        if not sort_by: return rows
+        with closing(self._db()) as db:
+            order = [r[0] for r in db.execute(
+                f"SELECT pos FROM docs WHERE pos IN (SELECT value FROM json_each(?)) "
+                f"ORDER BY {_q(sort_by)} IS NULL, {_q(sort_by)} {'ASC' if ascending else 'DESC'}, pos",
+                (json.dumps([int(p) for p in rows]),))]
+        return np.asarray(order, dtype=np.int64)
@@ -0,0 +1,63 @@
+import math
+import re
+from bisect import bisect_left
+import numpy as np
+import pandas as pd
+from helpers import _norm_txt
+
+# ---- BÚSQUEDA LIBRE ----
+SEARCH_COLUMNS = ["Nombre","Documento","Descripción","Temática ESG"]
+# Peso de cada columna en la relevancia (un acierto en el título cuenta más que en la descripción)
+SEARCH_WEIGHTS = {"Nombre": 3.0, "Documento": 2.0, "Temática ESG": 2.0, "Descripción": 1.0}
+
+_TOKEN_RE = re.compile(r"\w+")
+_EMPTY = np.empty(0, dtype=np.int64)
+
+def tokenize(x) -> list:
+    if x is None or (not isinstance(x, str) and pd.isna(x)): return []
+    return _TOKEN_RE.findall(_norm_txt(x))
+
+class SearchIndex:
+    # Índice invertido sin acentos: término -> (posiciones de fila, peso).
+    # Las consultas son AND entre términos, cada término casa por prefijo,
+    # y los resultados vuelven ordenados por relevancia (peso de columna x idf).
+    def __init__(self, df: pd.DataFrame, columns=SEARCH_COLUMNS, weights=SEARCH_WEIGHTS):
+        self.n = len(df)
+        acc = {}
+        for col in columns:
+            if col not in df.columns: continue
+            w = weights.get(col, 1.0)
+            for pos, val in enumerate(df[col].tolist()):
+                for tok in tokenize(val):
+                    rows = acc.setdefault(tok, {})
+                    rows[pos] = rows.get(pos, 0.0) + w
+        self.terms = sorted(acc)
+        self.postings = {}
+        for t, rows in acc.items():
+            idf = math.log(1 + self.n / len(rows))
+            self.postings[t] = (np.fromiter(rows.keys(), dtype=np.int64, count=len(rows)),
+                                np.fromiter(rows.values(), dtype=float, count=len(rows)) * idf)
+
+    def _match(self, tok):
+        lo = bisect_left(self.terms, tok)
+        hi = bisect_left(self.terms, tok + "\uffff", lo)
+        if lo == hi: return _EMPTY, np.empty(0)
+        hits = [self.postings[t] for t in self.terms[lo:hi]]
+        rows = np.concatenate([h[0] for h in hits]); w = np.concatenate([h[1] for h in hits])
+        rows, inv = np.unique(rows, return_inverse=True)
+        return rows, np.bincount(inv, weights=w)
+
+    def search(self, query: str) -> np.ndarray:
+        # Posiciones (iloc) de las filas que contienen todos los términos, de más a menos relevante
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens: return np.arange(self.n)
+        rows, score = None, None
+        for tok in tokens:
+            r, s = self._match(tok)
+            if rows is None:
+                rows, score = r, s
+            else:
+                rows, i, j = np.intersect1d(rows, r, assume_unique=True, return_indices=True)
+                score = score[i] + s[j]
+            if not len(rows): return _EMPTY
+        return rows[np.argsort(-score, kind="stable")]
@@ -0,0 +1,179 @@
+import hashlib
+import os
+import struct
+import threading
+import time
+import uuid
+from helpers import CACHE_DIR
+from perf import count
+
+# ---- CACHÉ COMPARTIDA ENTRE RÉPLICAS ----
+# El CSV del Sheet y el resultado del crawl de fuentes se guardan aquí para que, con varias
+# réplicas de Streamlit, sólo una descargue cada clave por TTL (single-flight): la que consigue
+# el lease refresca y las demás esperan su resultado en vez de repetir la descarga.
+# OBSERVATORIO_SHARED_CACHE:
+#   ""            ficheros en .cache/shared (procesos de la misma máquina o volumen compartido)
+#   "/ruta"       ficheros en esa carpeta
+#   "redis://..." servidor Redis (requiere el paquete redis)
+#   "memory"      sólo este proceso (pruebas)
+#   "off"         desactivada: cada proceso descarga por su cuenta
+SHARED_CACHE = os.environ.get("OBSERVATORIO_SHARED_CACHE", "")
+SHARED_LEASE = 120       # s; si el dueño del lease muere, otro puede refrescar pasado este plazo
+SHARED_WAIT = 60         # s máximos esperando a que otra réplica termine
+SHARED_POLL = 0.1
+
+_HEADER = struct.Struct("<d")   # instante de escritura delante del valor
+
+def _pack(value: bytes) -> bytes:
+    return _HEADER.pack(time.time()) + value
+
+def _unpack(data):
+    if data is None or len(data) < _HEADER.size: return None
+    return _HEADER.unpack_from(data)[0], bytes(data[_HEADER.size:])
+
+class SharedCache:
+    # get(key) -> (escrito_en, bytes) | None; put(key, bytes)
+    # acquire(key, ttl) -> token | None; release(key, token)
+    def fetch(self, key, max_age, compute, wait=SHARED_WAIT) -> bytes:
+        # Valor de key con menos de max_age segundos; si no lo hay, una sola réplica lo calcula
+        kind = key.split(":", 1)[0]
+        asked, deadline = time.time(), time.time() + wait
+        entry = None
+        while True:
+            entry = self.get(key)
+            # Vale lo que esté al día o lo que otra réplica haya escrito mientras esperábamos
+            if entry and (time.time() - entry[0] < max_age or entry[0] >= asked):
+                count("shared.hit", kind=kind); return entry[1]
+            token = self.acquire(key, SHARED_LEASE)
+            if token:
+                try:
+                    entry = self.get(key)
+                    if entry and (time.time() - entry[0] < max_age or entry[0] >= asked):
+                        count("shared.hit", kind=kind); return entry[1]
+                    count("shared.miss", kind=kind)
+                    value = compute()
+                    self.put(key, value)
+                    return value
+                finally:
+                    self.release(key, token)
+            if time.time() >= deadline: break
+            count("shared.wait", kind=kind)
+            time.sleep(SHARED_POLL)
+        # La otra réplica no termina: mejor algo viejo que nada; si no hay nada, se calcula aquí
+        count("shared.timeout", kind=kind)
+        return entry[1] if entry else compute()
+
+class MemoryCache(SharedCache):
+    def __init__(self):
+        self._data, self._leases = {}, {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            return _unpack(self._data.get(key))
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = _pack(value)
+
+    def acquire(self, key, ttl):
+        with self._lock:
+            held = self._leases.get(key)
+            if held and held[1] > time.time(): return None
+            token = uuid.uuid4().hex
+            self._leases[key] = (token, time.time() + ttl)
+            return token
+
+    def release(self, key, token):
+        with self._lock:
+            if self._leases.get(key, (None,))[0] == token: del self._leases[key]
+
+class FileCache(SharedCache):
+    # Un fichero por clave (se reemplaza con os.replace: nunca se lee a medio escribir) y un
+    # fichero .lock creado con O_EXCL como lease; su mtime dice cuándo caduca
+    def __init__(self, path=None):
+        self.path = path or os.path.join(CACHE_DIR, "shared")
+        os.makedirs(self.path, exist_ok=True)
+
+    def _file(self, key, ext):
+        return os.path.join(self.path, hashlib.sha1(key.encode("utf-8")).hexdigest()[:20] + ext)
+
+    def get(self, key):
+        try:
+            with open(self._file(key, ".bin"), "rb") as f:
+                return _unpack(f.read())
+        except OSError:
+            return None
+
+    def put(self, key, value):
+        path = self._file(key, ".bin")
+        tmp = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        try:
+            with open(tmp, "wb") as f: f.write(_pack(value))
+            os.replace(tmp, path)
+        except OSError:
+            try: os.remove(tmp)
+            except OSError: pass
+
+    def acquire(self, key, ttl):
+        path, token = self._file(key, ".lock"), uuid.uuid4().hex
+        for _ in range(2):
+            try:
+                fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(path) < ttl: return None
+                    os.remove(path)    # lease caducado: su dueño murió o se colgó
+                except OSError:
+                    pass
+                continue
+            except OSError:
+                return None
+            with os.fdopen(fd, "w") as f: f.write(token)
+            return token
+        return None
+
+    def release(self, key, token):
+        path = self._file(key, ".lock")
+        try:
+            with open(path) as f:
+                if f.read() == token: os.remove(path)
+        except OSError:
+            pass
+
+class RedisCache(SharedCache):
+    # Borra el lease sólo si sigue siendo nuestro
+    _RELEASE = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+
+    def __init__(self, url, prefix="observatorio:"):
+        import redis    # opcional: sólo hace falta con OBSERVATORIO_SHARED_CACHE=redis://...
+        self.r, self.prefix = redis.Redis.from_url(url), prefix
+
+    def get(self, key):
+        return _unpack(self.r.get(self.prefix + key))
+
+    def put(self, key, value):
+        self.r.set(self.prefix + key, _pack(value))
+
+    def acquire(self, key, ttl):
+        token = uuid.uuid4().hex
+        return token if self.r.set(self.prefix + "lock:" + key, token, nx=True, px=int(ttl * 1000)) else None
+
+    def release(self, key, token):
+        self.r.eval(self._RELEASE, 1, self.prefix + "lock:" + key, token)
+
+def make_shared_cache(spec=SHARED_CACHE):
+    spec = (spec or "").strip()
+    if spec.lower() in ("off", "0", "none"): return None
+    if spec.lower() == "memory": return MemoryCache()
+    if spec.startswith(("redis://", "rediss://", "unix://")): return RedisCache(spec)
+    return FileCache(spec or None)
+
+_shared, _shared_lock = None, threading.Lock()
+_UNSET = object()
+
+def get_shared_cache():
+    global _shared
+    with _shared_lock:
+        if _shared is None: _shared = make_shared_cache() or _UNSET
+    return None if _shared is _UNSET else _shared
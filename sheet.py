@@ -0,0 +1,175 @@
+import hashlib
+import os
+import re
+import threading
+import time
+import pandas as pd
+from io import StringIO
+from urllib.parse import quote
+from helpers import CACHE_DIR, norm_series
+from http_client import get_client
+from perf import count, span
+from shared_cache import get_shared_cache
+
+# ---- REPOSITORIO (Google Sheet) ----
+COLUMNS = [
+    "Nombre","Documento","Link","Autoridad emisora","Tipo de documento","Ámbito de aplicación",
+    "Tema ESG","Temática ESG","Descripción","Aplicación",
+    "Fecha de publicación","Fecha de aplicación","Comentarios",
+    "UG 01, 02, 03 - bancos","UG04 - Asset management","UG05 - Seguros","UG06 - LATAM","UG07 - Corporates",
+    "Estado","Mes publicación","Año publicación"
+]
+
+SHEET_TTL = 30
+SHEET_MAX_BYTES = 128 * 1024 * 1024   # el CSV completo puede superar el tope general del cliente
+
+def sheet_url(sheet_id: str, worksheet: str) -> str:
+    return f"https://docs.google.com/spreadsheets/d/{sheet_id}/gviz/tq?tqx=out:csv&sheet={quote(worksheet)}"
+
+# Tipos compactos: categorías para los campos de pocos valores, booleanos para las UG,
+# strings de Arrow para el texto libre y fechas como datetime64 (día primero, como el Sheet)
+CATEGORY_COLUMNS = ["Autoridad emisora","Tipo de documento","Ámbito de aplicación","Tema ESG","Estado"]
+UG_COLUMNS = [c for c in COLUMNS if c.startswith("UG")]
+DATE_COLUMNS = ["Fecha de publicación","Fecha de aplicación"]
+TEXT_COLUMNS = [c for c in COLUMNS if c not in CATEGORY_COLUMNS + UG_COLUMNS + DATE_COLUMNS + ["Año publicación"]]
+DATE_FORMATS = ["%d/%m/%Y", "%d/%m/%Y %H:%M:%S", "ISO8601"]
+UG_TRUE = {"si", "s", "x", "yes", "y", "true", "1"}
+try:
+    import pyarrow  # noqa: F401
+    TEXT_DTYPE = pd.StringDtype("pyarrow")
+except ImportError:
+    TEXT_DTYPE = pd.StringDtype()
+
+def parse_dates(s: pd.Series) -> pd.Series:
+    # Cada formato se prueba sólo sobre lo que aún no se ha reconocido
+    s = s.astype(TEXT_DTYPE).str.strip()
+    out = pd.Series(pd.NaT, index=s.index, dtype="datetime64[ns]")
+    for fmt in DATE_FORMATS:
+        todo = out.isna() & s.notna() & (s != "")
+        if not todo.any(): break
+        out[todo] = pd.to_datetime(s[todo], format=fmt, errors="coerce")
+    return out
+
+def extract_links(s: pd.Series) -> pd.Series:
+    # =HYPERLINK("url";"texto") -> url; el resto se deja igual
+    s = s.astype(TEXT_DTYPE).str.strip()
+    url = s.str.extract(r'^=HYPERLINK\(\s*"([^"]*)"', flags=re.IGNORECASE)[0].astype(TEXT_DTYPE)
+    return url.where(s.str.startswith("=").fillna(False), s)
+
+def ensure_schema(df: pd.DataFrame) -> pd.DataFrame:
+    df.columns = [str(c).strip() for c in df.columns]
+    for c in COLUMNS:
+        if c not in df.columns: df[c] = pd.NA
+    df = df[COLUMNS].copy()
+    for c in TEXT_COLUMNS:
+        df[c] = df[c].astype(TEXT_DTYPE)
+    df["Link"] = extract_links(df["Link"])
+    df["Mes publicación"] = df["Mes publicación"].fillna("")
+    for c in CATEGORY_COLUMNS:
+        df[c] = df[c].astype(TEXT_DTYPE).str.strip().replace("", pd.NA).astype("category")
+    for c in UG_COLUMNS:
+        df[c] = norm_series(df[c]).str.strip().isin(UG_TRUE)
+    for c in DATE_COLUMNS:
+        df[c] = parse_dates(df[c])
+    df["Año publicación"] = pd.to_numeric(df["Año publicación"], errors="coerce").astype("Int16")
+    return df
+
+def parse_sheet_csv(text: str) -> pd.DataFrame:
+    with span("sheet.read_csv"):
+        df = pd.read_csv(StringIO(text)).dropna(how="all")
+    with span("sheet.ensure_schema"):
+        return ensure_schema(df)
+
+class SheetLoader:
+    # Carga incremental con stale-while-revalidate:
+    # - si el CSV no cambia (mismo hash) no se vuelve a parsear ni a pasar por ensure_schema
+    # - caducado el TTL se sirve lo que hay y se refresca en segundo plano
+    # - la última versión buena se guarda en disco para arranques en frío / caídas de Google
+    # - con caché compartida (shared_cache) sólo una réplica descarga el CSV por TTL
+    # - con sink, cada versión nueva se entrega a sink(df, versión) y el loader no se queda el df
+    #   (get_versioned devuelve (None, versión)): p. ej. el volcado al SQLite de repo_store
+    def __init__(self, url, ttl=SHEET_TTL, snapshot_path=None, parse=parse_sheet_csv, shared=None, sink=None):
+        self.url, self.ttl, self.parse, self.sink = url, ttl, parse, sink
+        self.shared = shared if shared is not None else get_shared_cache()
+        name = hashlib.sha1(url.encode()).hexdigest()[:16]
+        self.snapshot_path = snapshot_path or os.path.join(CACHE_DIR, f"sheet_{name}.csv")
+        self.df, self.version, self.loaded_at, self.error = None, None, 0.0, None
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def _fetch(self) -> str:
+        with span("sheet.download"):
+            r = get_client().get(self.url, timeout=20, max_bytes=SHEET_MAX_BYTES); r.raise_for_status()
+            return r.text
+
+    def _download(self) -> str:
+        if self.shared is None: return self._fetch()
+        return self.shared.fetch(f"sheet:{self.url}", self.ttl, lambda: self._fetch().encode("utf-8")).decode("utf-8")
+
+    def _apply(self, text, save=True):
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        count("sheet.parse" if digest != self.version else "sheet.unchanged")
+        if digest != self.version:
+            df = self.parse(text)
+            if self.sink is not None:
+                self.sink(df, digest); df = None
+            with self._lock:
+                self.df, self.version = df, digest
+            if save: self._save_snapshot(text)
+        self.loaded_at = time.time()
+
+    def _save_snapshot(self, text):
+        try:
+            os.makedirs(os.path.dirname(self.snapshot_path) or ".", exist_ok=True)
+            tmp = self.snapshot_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f: f.write(text)
+            os.replace(tmp, self.snapshot_path)
+        except OSError:
+            pass
+
+    def _load_snapshot(self):
+        try:
+            with open(self.snapshot_path, encoding="utf-8") as f:
+                self._apply(f.read(), save=False)
+            self.loaded_at = 0.0  # la copia local cuenta como caducada
+            return True
+        except (OSError, ValueError):
+            return False
+
+    def refresh(self):
+        try:
+            self._apply(self._download())
+            self.error = None
+        except Exception as e:
+            self.error = e
+            if self.version is None: raise
+        finally:
+            self._refreshing = False
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing: return
+            self._refreshing = True
+        threading.Thread(target=self.refresh, daemon=True).start()
+
+    def get_versioned(self):
+        # (df, hash del CSV) leídos juntos para que no se mezclen con un refresco en curso
+        # hit: en memoria y al día; stale: se sirve lo que hay y se refresca; miss: hay que cargarlo
+        if self.version is None and not self._load_snapshot():
+            count("load_sheet.miss")
+            self._refreshing = True
+            self.refresh()
+        elif time.time() - self.loaded_at >= self.ttl:
+            count("load_sheet.stale")
+            self._refresh_in_background()
+        else:
+            count("load_sheet.hit")
+        with self._lock:
+            return self.df, self.version
+
+    def get(self) -> pd.DataFrame:
+        return self.get_versioned()[0]
+
+    @property
+    def stale(self) -> bool:
+        return self.error is not None
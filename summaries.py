@@ -0,0 +1,101 @@
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from crawler import get_host_limiter, get_robots_cache, host_of
+from helpers import CACHE_DIR
+from extraction import extract_summary, iter_text
+from http_client import get_client
+from perf import count
+
+# ---- RESÚMENES (What's new) ----
+# Los artículos se descargan con las mismas reglas que el crawl: robots.txt (Crawl-delay incluido)
+# y los límites por host del proceso (crawler.get_host_limiter)
+SUMMARY_DB = os.path.join(CACHE_DIR, "summaries.sqlite")
+SUMMARY_TTL = 24 * 3600      # pasado este tiempo se revalida con ETag/Last-Modified
+SUMMARY_MAX_WORKERS = 8
+SUMMARY_FALLBACK = "No se pudo generar resumen."   # sólo se muestra; no se guarda
+
+class SummaryCache:
+    # Caché en disco (SQLite) por URL; sobrevive a reinicios del proceso
+    def __init__(self, path=SUMMARY_DB):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("""CREATE TABLE IF NOT EXISTS summaries (
+            url TEXT PRIMARY KEY, summary TEXT, max_sent INTEGER,
+            etag TEXT, last_modified TEXT, checked_at REAL)""")
+        self._db.commit()
+
+    def get(self, url):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT summary, max_sent, etag, last_modified, checked_at FROM summaries WHERE url=?", (url,)
+            ).fetchone()
+        if row is None: return None
+        return dict(zip(["summary","max_sent","etag","last_modified","checked_at"], row))
+
+    def put(self, url, summary, max_sent, etag=None, last_modified=None):
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO summaries VALUES (?,?,?,?,?,?)",
+                             (url, summary, max_sent, etag, last_modified, time.time()))
+            self._db.commit()
+
+    def touch(self, url):
+        with self._lock:
+            self._db.execute("UPDATE summaries SET checked_at=? WHERE url=?", (time.time(), url))
+            self._db.commit()
+
+_default_cache = None
+_cache_lock = threading.Lock()
+
+def get_summary_cache():
+    global _default_cache
+    with _cache_lock:
+        if _default_cache is None: _default_cache = SummaryCache()
+        return _default_cache
+
+def fetch_summary(url, max_sent=3, cache=None, ttl=SUMMARY_TTL, timeout=20, robots=None, limiter=None):
+    # None si no se pudo descargar (o robots.txt lo veta) y no hay copia: quien lo guarde lo volverá a intentar
+    cache = cache or get_summary_cache()
+    hit = cache.get(url)
+    usable = hit is not None and hit["max_sent"] == max_sent
+    if usable and time.time() - hit["checked_at"] < ttl:
+        count("summary.hit")
+        return hit["summary"]
+    headers = {}
+    if usable:
+        if hit["etag"]: headers["If-None-Match"] = hit["etag"]
+        if hit["last_modified"]: headers["If-Modified-Since"] = hit["last_modified"]
+    robots, limiter = robots or get_robots_cache(), limiter or get_host_limiter()
+    try:
+        if not robots.allowed(url):
+            count("summary.blocked")
+            return hit["summary"] if usable else None
+        limiter.bucket(host_of(url)).slow_down(robots.crawl_delay(url))
+        # Se deja de leer el artículo en cuanto hay max_sent frases
+        with limiter.slot(url), get_client().stream("GET", url, timeout=timeout, headers=headers) as r:
+            if r.status_code == 304 and usable:
+                count("summary.revalidated")
+                cache.touch(url)
+                return hit["summary"]
+            r.raise_for_status()
+            summary = extract_summary(iter_text(r), max_sent=max_sent)
+            etag, last_modified = r.headers.get("ETag"), r.headers.get("Last-Modified")
+    except Exception:
+        count("summary.error")
+        return hit["summary"] if usable else None
+    count("summary.miss")
+    cache.put(url, summary, max_sent, etag, last_modified)
+    return summary
+
+def summarize_urls(urls, max_sent=3, cache=None, max_workers=SUMMARY_MAX_WORKERS):
+    # Resumen por lotes: una sola vez por URL; en paralelo entre hosts, y en cada host sólo lo que
+    # permitan sus límites
+    urls = list(dict.fromkeys(urls))
+    if not urls: return {}
+    cache = cache or get_summary_cache()
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(urls)))) as pool:
+        out = pool.map(lambda u: fetch_summary(u, max_sent=max_sent, cache=cache), urls)
+        return dict(zip(urls, out))
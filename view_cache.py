@@ -0,0 +1,65 @@
+import sys
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from perf import count
+from search import tokenize
+
+# ---- CACHÉ DE VISTAS FILTRADAS ----
+# Filas, recuentos por faceta y KPIs/gráficos de una combinación de filtros + búsqueda, compartidos
+# por todas las sesiones del proceso. La clave es (versión del Sheet, filtros normalizados,
+# términos de búsqueda): el orden de los valores elegidos, mayúsculas o acentos no cuentan.
+# LRU con tope en bytes; al llegar otra versión del Sheet se vacía lo de la anterior.
+VIEW_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+def view_key(sheet_version, selections: dict, query: str = "") -> tuple:
+    facets = tuple(sorted((col, tuple(sorted(values, key=str))) for col, values in selections.items() if values))
+    return sheet_version, facets, tuple(dict.fromkeys(tokenize(query)))
+
+def _nbytes(obj) -> int:
+    if isinstance(obj, np.ndarray): return obj.nbytes
+    if isinstance(obj, (pd.DataFrame, pd.Series)): return int(obj.memory_usage(deep=True).sum())
+    if isinstance(obj, dict): return sys.getsizeof(obj) + sum(_nbytes(k) + _nbytes(v) for k, v in obj.items())
+    return sys.getsizeof(obj)
+
+class ViewCache:
+    def __init__(self, max_bytes=VIEW_CACHE_MAX_BYTES):
+        self.max_bytes, self.nbytes = max_bytes, 0
+        self._entries = OrderedDict()     # clave -> (vista, bytes)
+        self._version = None
+        self._lock = threading.Lock()
+
+    def get(self, key, compute):
+        # compute() -> {"rows", "counts", "overview"}; se ejecuta fuera del lock
+        with self._lock:
+            if key[0] != self._version: self._drop_version(key[0])
+            hit = self._entries.get(key)
+            if hit is not None:
+                self._entries.move_to_end(key)
+                count("view_cache.hit")
+                return hit[0]
+        count("view_cache.miss")
+        view = compute()
+        view["rows"].flags.writeable = False     # compartido entre sesiones: sólo lectura
+        size = _nbytes(view)
+        with self._lock:
+            if key[0] == self._version and size <= self.max_bytes and key not in self._entries:
+                self._entries[key] = (view, size)
+                self.nbytes += size
+                while self.nbytes > self.max_bytes:
+                    _, (_, freed) = self._entries.popitem(last=False)
+                    self.nbytes -= freed
+                    count("view_cache.evict")
+        return view
+
+    def _drop_version(self, version):
+        self._entries.clear()
+        self.nbytes, self._version = 0, version
+
+    def clear(self):
+        with self._lock:
+            self._drop_version(None)
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+from aggregates import overview
+
+# ---- VISTAS FILTRADAS SIN COPIA ----
+# El df del Sheet es uno solo, compartido por todas las sesiones, y no se modifica.
+# Filtros, búsqueda y orden trabajan con posiciones de fila (np.ndarray); los datos sólo se
+# copian al pintar, y sólo la página visible con las columnas elegidas.
+def filter_rows(fidx, selections: dict, ranked=None) -> np.ndarray:
+    # Intersección de bitmaps; con búsqueda se respeta el orden por relevancia
+    base = None if ranked is None else fidx.from_positions(ranked)
+    mask = fidx.mask(selections, base)
+    return fidx.positions(mask) if ranked is None else ranked[fidx.to_bool(mask)[ranked]]
+
+def sort_rows(df: pd.DataFrame, rows: np.ndarray, sort_by=None, ascending=True) -> np.ndarray:
+    # Sólo se lee la columna de orden para esas filas; sin columna se mantiene el orden recibido
+    if not sort_by: return rows
+    s = df[sort_by].iloc[rows].reset_index(drop=True)
+    try:
+        order = s.sort_values(ascending=ascending, na_position="last", kind="stable").index
+    except TypeError:
+        order = s.sort_values(ascending=ascending, na_position="last", kind="stable", key=lambda x: x.astype(str)).index
+    return rows[order.to_numpy()]
+
+def page_rows(rows: np.ndarray, page: int, size: int) -> np.ndarray:
+    return rows[(page - 1) * size: page * size]
+
+def materialize(df: pd.DataFrame, rows: np.ndarray, columns=None) -> pd.DataFrame:
+    cols = list(df.columns) if columns is None else list(columns)
+    return df.iloc[rows, [df.columns.get_loc(c) for c in cols]]
+
+class FrameRepository:
+    # Mismas consultas que repo_store.RepositoryStore, resueltas sobre el df en memoria.
+    # search_index: función que devuelve el SearchIndex (se construye la primera vez que se busca)
+    def __init__(self, df: pd.DataFrame, fidx, search_index=None):
+        self.df, self.fidx, self.search_index = df, fidx, search_index
+
+    def search(self, query: str) -> np.ndarray:
+        return self.search_index().search(query)
+
+    def options(self) -> dict:
+        return self.fidx.options
+
+    def counts(self, selections: dict, ranked=None) -> dict:
+        return self.fidx.counts(selections, None if ranked is None else self.fidx.from_positions(ranked))
+
+    def rows(self, selections: dict, ranked=None) -> np.ndarray:
+        return filter_rows(self.fidx, selections, ranked)
+
+    def overview(self, selections: dict, ranked=None) -> dict:
+        return overview(self.df, self.rows(selections, ranked))
+
+    def sort(self, rows, sort_by, ascending=True) -> np.ndarray:
+        return sort_rows(self.df, rows, sort_by, ascending)
+
+    def page(self, positions, columns=None) -> pd.DataFrame:
+        return materialize(self.df, np.asarray(positions, dtype=np.int64), columns)